@@ -17,8 +17,14 @@ from __future__ import annotations
 import warnings
 
 import os
+import heapq
 import math
 import logging
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from operator import itemgetter
+from sys import intern
 from typing import Dict, List, Any, Set, Optional
 
 logger = logging.getLogger(__name__)
@@ -26,6 +32,17 @@ logger = logging.getLogger(__name__)
 # Environment variables
 DIVERSITY_ROUNDS_THRESHOLD = int(os.getenv("DIVERSITY_ROUNDS_THRESHOLD", "50000"))
 
+# Combination weight by representation band: index = how many of the edges
+# (target x 0.5, 1, 2, 3, 5) a combination's share of papers strictly exceeds
+COMBO_WEIGHT_STEPS = (
+    3.0,   # Severely under-represented: strong bonus
+    1.5,   # Under-represented: moderate bonus
+    0.0,   # Adequately represented: neutral
+    -1.0,  # Well-represented: small penalty
+    -2.0,  # Over-represented: moderate penalty
+    -4.0,  # Severely over-represented: strong penalty
+)
+
 
 def _is_survey_like(doc: Dict) -> bool:
     """
@@ -57,7 +74,19 @@ def _is_survey_like(doc: Dict) -> bool:
     return False
 
 
-def analyze_combination_distribution(docs: List[Dict]) -> Dict[str, Dict[str, int]]:
+@lru_cache(maxsize=100_000)
+def split_supplements(raw: str) -> tuple:
+    """
+    Split a comma-separated supplements field into stripped, non-empty names.
+
+    Cached on the raw string: the iterative selector re-scores the same papers
+    every round, and many papers share identical supplement lists. Names are
+    interned so combination-key lookups compare them by identity.
+    """
+    return tuple(intern(s.strip()) for s in raw.split(",") if s.strip())
+
+
+def analyze_combination_distribution(docs: List[Dict]) -> Dict[str, Counter]:
     """
     Analyze existing papers for factor combinations
     
@@ -65,59 +94,65 @@ def analyze_combination_distribution(docs: List[Dict]) -> Dict[str, Dict[str, in
         docs: List of paper dictionaries
         
     Returns:
-        Dictionary with combination counts by type
+        Dictionary with combination counts by type, keyed by factor tuples
+        (e.g. ("creatine", "muscle_gain"))
     """
     combinations = {
-        "supplement_goal": {},      # creatine + muscle_gain
-        "supplement_population": {}, # beta-alanine + athletes  
-        "goal_population": {},      # muscle_gain + elderly
-        "study_type_goal": {},      # meta-analysis + weight_loss
-        "journal_supplement": {}    # J Appl Physiol + creatine
+        "supplement_goal": Counter(),       # (creatine, muscle_gain)
+        "supplement_population": Counter(), # (beta-alanine, athletes)
+        "goal_population": Counter(),       # (muscle_gain, elderly)
+        "study_type_goal": Counter(),       # (meta-analysis, weight_loss)
+        "journal_supplement": Counter()     # (j appl physiol, creatine)
     }
     
     # Filter out survey-like papers for weight calculation
-    filtered_docs = [doc for doc in docs if not _is_survey_like(doc)]
-    
-    for doc in filtered_docs:
-        # Extract factors
-        supplements = (doc.get("supplements") or "").split(",")
-        primary_goal = doc.get("primary_goal") or ""
-        population = doc.get("population") or ""
-        study_type = doc.get("study_type") or ""
-        journal = (doc.get("journal") or "").lower()
-        
-        # Track supplement + goal combinations
-        for supp in supplements:
-            if supp.strip() and primary_goal:
-                key = f"{supp.strip()}_{primary_goal}"
-                combinations["supplement_goal"][key] = combinations["supplement_goal"].get(key, 0) + 1
-        
-        # Track supplement + population combinations
-        for supp in supplements:
-            if supp.strip() and population:
-                key = f"{supp.strip()}_{population}"
-                combinations["supplement_population"][key] = combinations["supplement_population"].get(key, 0) + 1
-        
-        # Track goal + population combinations
-        if primary_goal and population:
-            key = f"{primary_goal}_{population}"
-            combinations["goal_population"][key] = combinations["goal_population"].get(key, 0) + 1
-        
-        # Track study type + goal combinations
-        if study_type and primary_goal:
-            key = f"{study_type}_{primary_goal}"
-            combinations["study_type_goal"][key] = combinations["study_type_goal"].get(key, 0) + 1
-        
-        # Track journal + supplement combinations
-        for supp in supplements:
-            if supp.strip() and journal:
-                key = f"{journal}_{supp.strip()}"
-                combinations["journal_supplement"][key] = combinations["journal_supplement"].get(key, 0) + 1
+    for doc in docs:
+        if _is_survey_like(doc):
+            continue
+        for combo_type, keys in _doc_combinations(doc).items():
+            combinations[combo_type].update(keys)
     
     return combinations
 
 
-def calculate_combination_weights(combinations: Dict[str, Dict[str, int]], total_docs: int) -> Dict[str, Dict[str, float]]:
+def _paper_factors(doc: Dict) -> tuple:
+    """(supplements, primary_goal, population, study_type, journal_lower) for one paper"""
+    # Interned: these come from small vocabularies and make up every combination key
+    return (
+        split_supplements(doc.get("supplements") or ""),
+        intern(doc.get("primary_goal") or ""),
+        intern(doc.get("population") or ""),
+        intern(doc.get("study_type") or ""),
+        intern((doc.get("journal") or "").lower()),
+    )
+
+
+def _doc_combinations(doc: Dict, factors: Optional[tuple] = None) -> Dict[str, List[tuple]]:
+    """Combination keys a single paper contributes, by combination type"""
+    supplements, primary_goal, population, study_type, journal = factors or _paper_factors(doc)
+    
+    return {
+        "supplement_goal": [(supp, primary_goal) for supp in supplements] if primary_goal else [],
+        "supplement_population": [(supp, population) for supp in supplements] if population else [],
+        "goal_population": [(primary_goal, population)] if primary_goal and population else [],
+        "study_type_goal": [(study_type, primary_goal)] if study_type and primary_goal else [],
+        "journal_supplement": [(journal, supp) for supp in supplements] if journal else [],
+    }
+
+
+def _discount_combinations(combinations: Dict[str, Counter], doc: Dict, factors: Optional[tuple] = None) -> None:
+    """Remove one paper's contribution from counts built by analyze_combination_distribution"""
+    if _is_survey_like(doc):
+        return
+    for combo_type, keys in _doc_combinations(doc, factors).items():
+        counts = combinations[combo_type]
+        for key in keys:
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]  # Match a fresh count, which never lists absent combos
+
+
+def calculate_combination_weights(combinations: Dict[str, Dict[tuple, int]], total_docs: int) -> Dict[str, Dict[tuple, float]]:
     """
     Calculate weights based on combination representation
     
@@ -139,99 +174,88 @@ def calculate_combination_weights(combinations: Dict[str, Dict[str, int]], total
     else:
         target_percentage = 0.01  # 1% for large datasets
     
+    edges = (target_percentage * 0.5, target_percentage, target_percentage * 2,
+             target_percentage * 3, target_percentage * 5)
+    
     for combo_type, combo_counts in combinations.items():
-        weights[combo_type] = {}
-        
-        for combo, count in combo_counts.items():
-            current_percentage = count / total_docs
-            
-            if current_percentage > target_percentage * 5:  # Severely over-represented
-                weights[combo_type][combo] = -4.0  # Strong penalty
-            elif current_percentage > target_percentage * 3:  # Over-represented
-                weights[combo_type][combo] = -2.0  # Moderate penalty
-            elif current_percentage > target_percentage * 2:  # Well-represented
-                weights[combo_type][combo] = -1.0  # Small penalty
-            elif current_percentage > target_percentage:  # Adequately represented
-                weights[combo_type][combo] = 0.0  # Neutral
-            elif current_percentage > target_percentage * 0.5:  # Under-represented
-                weights[combo_type][combo] = 1.5  # Moderate bonus
-            else:  # Severely under-represented
-                weights[combo_type][combo] = 3.0  # Strong bonus
+        # The weight depends only on the count, and counts repeat heavily: band each
+        # distinct count once, then map every combination through that table
+        by_count = {
+            count: COMBO_WEIGHT_STEPS[bisect_left(edges, count / total_docs)]
+            for count in set(combo_counts.values())
+        }
+        weights[combo_type] = {combo: by_count[count] for combo, count in combo_counts.items()}
     
     return weights
 
 
-def calculate_combination_score(paper: Dict, combination_weights: Dict[str, Dict[str, float]]) -> float:
+def calculate_combination_score(
+    paper: Dict,
+    combination_weights: Dict[str, Dict[tuple, float]],
+    factors: Optional[tuple] = None,
+) -> float:
     """
     Calculate score based on paper's factor combinations with gating and normalization
     
     Args:
         paper: Paper dictionary
         combination_weights: Dictionary with combination weights
+        factors: Precomputed _paper_factors(paper), reused across filtering rounds
         
     Returns:
         Combination score (gated and normalized)
     """
+    # No weights yet (first scoring pass): nothing can contribute
+    if not combination_weights:
+        return 0.0
+    
+    # Gate boosting first (do NOT cap counts): gated papers skip the weight lookups
+    category = paper.get("study_category", "other")
+    outcomes_str = (paper.get("outcomes") or "").strip()
+    outcomes_present = bool(outcomes_str)
+    
+    if (category == "observational_usage" or 
+        (not outcomes_present and category not in {"intervention", "meta_analysis", "systematic_review"})):
+        # Lazy %-args: this runs per paper per filtering round, so skip formatting unless DEBUG is on
+        logger.debug("combo_gated pmid=%s category=%s outcomes=%s", paper.get("pmid"), category, outcomes_present)
+        return 0.0  # Leave reliability untouched
+    
     # Compute base combination score
     score = 0.0
     
     # Extract paper factors
-    supplements = (paper.get("supplements") or "").split(",")
-    primary_goal = paper.get("primary_goal") or ""
-    population = paper.get("population") or ""
-    study_type = paper.get("study_type") or ""
-    journal = (paper.get("journal") or "").lower()
+    supplements, primary_goal, population, study_type, journal = factors or _paper_factors(paper)
     
     # Check supplement + goal combinations
-    for supp in supplements:
-        if supp.strip() and primary_goal:
-            key = f"{supp.strip()}_{primary_goal}"
-            weight = combination_weights.get("supplement_goal", {}).get(key, 0.0)
-            score += weight
+    if primary_goal:
+        w = combination_weights.get("supplement_goal", {})
+        score += sum(w.get((supp, primary_goal), 0.0) for supp in supplements)
     
     # Check supplement + population combinations
-    for supp in supplements:
-        if supp.strip() and population:
-            key = f"{supp.strip()}_{population}"
-            weight = combination_weights.get("supplement_population", {}).get(key, 0.0)
-            score += weight
+    if population:
+        w = combination_weights.get("supplement_population", {})
+        score += sum(w.get((supp, population), 0.0) for supp in supplements)
     
     # Check goal + population combinations
     if primary_goal and population:
-        key = f"{primary_goal}_{population}"
-        weight = combination_weights.get("goal_population", {}).get(key, 0.0)
-        score += weight
+        score += combination_weights.get("goal_population", {}).get((primary_goal, population), 0.0)
     
     # Check study type + goal combinations
     if study_type and primary_goal:
-        key = f"{study_type}_{primary_goal}"
-        weight = combination_weights.get("study_type_goal", {}).get(key, 0.0)
-        score += weight
+        score += combination_weights.get("study_type_goal", {}).get((study_type, primary_goal), 0.0)
     
     # Check journal + supplement combinations
-    for supp in supplements:
-        if supp.strip() and journal:
-            key = f"{journal}_{supp.strip()}"
-            weight = combination_weights.get("journal_supplement", {}).get(key, 0.0)
-            score += weight
-    
-    # Gate boosting (do NOT cap counts)
-    category = paper.get("study_category", "other")
-    outcomes_str = (paper.get("outcomes") or "").strip()
-    outcomes_present = bool(outcomes_str)
-    
-    if (category == "observational_usage" or 
-        (not outcomes_present and category not in {"intervention", "meta_analysis", "systematic_review"})):
-        logging.debug(f"combo_gated pmid={paper.get('pmid')} category={category} outcomes={outcomes_present}")
-        return 0.0  # Leave reliability untouched
+    if journal:
+        w = combination_weights.get("journal_supplement", {})
+        score += sum(w.get((journal, supp), 0.0) for supp in supplements)
     
     # Normalize by breadth and cap relative to reliability
     if score > 0:
-        breadth = max(1, len([s for s in supplements if s.strip()]))
+        breadth = max(1, len(supplements))
         score *= (1.0 / math.sqrt(breadth))
         base = float(paper.get("reliability_score", 0.0))
         score = min(score, min(5.0, 0.30 * base))
-        logging.debug(f"combo_norm pmid={paper.get('pmid')} breadth={breadth} base={base:.1f} final={score:.3f}")
+        logger.debug("combo_norm pmid=%s breadth=%d base=%.1f final=%.3f", paper.get("pmid"), breadth, base, score)
     
     return score
 
@@ -254,8 +278,7 @@ RARE_THRESHOLD = int(os.getenv("RARE_THRESHOLD", "5"))
 EXCLUDED_SUPPS_FOR_MIN = {s.strip() for s in os.getenv("EXCLUDED_SUPPS_FOR_MIN", "nitric-oxide").split(",") if s.strip()}
 
 def _get_supps(doc: Dict[str, Any]) -> List[str]:
-    raw = (doc.get("supplements") or "").split(",")
-    return [s.strip() for s in raw if s.strip()]
+    return list(split_supplements(doc.get("supplements") or ""))
 
 def _build_supp_index(docs: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
     by_supp: Dict[str, List[Dict[str, Any]]] = {}
@@ -285,36 +308,25 @@ def compute_enhanced_quota_ids(
     if min_overall <= 0 and min_per_goal <= 0:
         return protected
     
-    by_supp = _build_supp_index(all_docs)
+    # Apply the quality floor before indexing so only eligible papers are bucketed and
+    # sorted; each bucket then comes back ordered by reliability DESC, year DESC
+    quality_docs = [d for d in all_docs if d.get("reliability_score", 0.0) >= quality_floor]
+    by_supp = _build_supp_index(quality_docs)
     
-    for supp, supp_docs in by_supp.items():
-        # Apply quality floor
-        quality_docs = [d for d in supp_docs if d.get("reliability_score", 0.0) >= quality_floor]
-        if not quality_docs:
-            continue
-        
-        # Sort by reliability score DESC, with year as tiebreaker
-        def sort_key(doc):
-            score = doc.get("reliability_score", 0.0)
-            year = doc.get("year", 0) or 0
-            return (-score, -year)  # Both descending
-        
-        sorted_docs = sorted(quality_docs, key=sort_key)
-        
+    for supp, sorted_docs in by_supp.items():
         # Protect top N overall
         for d in sorted_docs[:min_overall]:
             if d.get("id"):
                 protected.add(d["id"])
         
-        # Protect top M per goal
+        # Protect top M per goal (grouping preserves the bucket's sort order)
         by_goal: Dict[str, List[Dict[str, Any]]] = {}
-        for d in quality_docs:
+        for d in sorted_docs:
             goal = d.get("primary_goal", "").strip() or "general"
             by_goal.setdefault(goal, []).append(d)
         
         for goal, goal_docs in by_goal.items():
-            sorted_goal = sorted(goal_docs, key=sort_key)
-            for d in sorted_goal[:min_per_goal]:
+            for d in goal_docs[:min_per_goal]:
                 if d.get("id"):
                     protected.add(d["id"])  # Set union handles overlaps
     
@@ -344,39 +356,39 @@ def _iterative_diversity_filtering_internal(
         protected_ids: Set of IDs that cannot be eliminated
     """
     protected_ids = protected_ids or set()
-    current_papers = papers.copy()
+    current_papers = papers  # Rebound (never sorted in place) each round, so no up-front copy
     round_num = 1
+    # Count combinations once; each round only discounts the papers it eliminates
+    combinations = analyze_combination_distribution(current_papers)
+    # Paper factors never change between rounds; derive them once (kept off the docs, which get saved)
+    factors = {id(p): _paper_factors(p) for p in current_papers}
 
     while len(current_papers) > target_count:
         papers_to_eliminate = min(elimination_per_round, len(current_papers) - target_count)
 
         # Recalculate combination weights based on current paper set
-        combinations = analyze_combination_distribution(current_papers)
         combination_weights = calculate_combination_weights(combinations, len(current_papers))
 
         # Re-score with updated weights
         for paper in current_papers:
-            combination_score = calculate_combination_score(paper, combination_weights)
+            combination_score = calculate_combination_score(paper, combination_weights, factors[id(paper)])
             paper["combination_score"] = combination_score
             paper["enhanced_score"] = paper.get("reliability_score", 0) + combination_score
 
-        # Sort by enhanced_score ASC (lowest first for elimination)
-        current_papers.sort(key=lambda doc: doc.get("enhanced_score", 0))
+        # Sort by enhanced_score ASC (lowest first for elimination). The sort is stable, so
+        # ties at the cutoff keep the previous round's rank; a heap selection over input
+        # order would change which tied papers survive.
+        current_papers = sorted(current_papers, key=itemgetter("enhanced_score"))
 
         # Eliminate papers from the bottom, respecting protected IDs
         eliminated = 0
         survivors: List[Dict[str, Any]] = []
         for d in current_papers:
-            if d.get("id") in protected_ids:
-                survivors.append(d)
-                continue
-            
-            if eliminated >= papers_to_eliminate:
+            if eliminated >= papers_to_eliminate or d.get("id") in protected_ids:
                 survivors.append(d)
                 continue
-            
-            # Eliminate this paper
             eliminated += 1
+            _discount_combinations(combinations, d, factors[id(d)])
 
         current_papers = survivors
         round_num += 1
@@ -385,9 +397,8 @@ def _iterative_diversity_filtering_internal(
         if eliminated == 0 and len(current_papers) > target_count:
             break
 
-    # Final sort by enhanced score (desc) for stable output
-    current_papers.sort(key=lambda x: x.get("enhanced_score", 0), reverse=True)
-    return current_papers[:target_count]
+    # Final top-K by enhanced score (desc); heap selection returns the same order as a stable sort
+    return heapq.nlargest(target_count, current_papers, key=lambda x: x.get("enhanced_score", 0))
 
 # Backward-compatible wrapper that allows passing protected IDs
 def iterative_diversity_filtering_with_protection(*args, **kwargs):
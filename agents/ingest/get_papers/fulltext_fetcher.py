@@ -38,6 +38,7 @@ import re
 import hashlib
 import time
 import unicodedata
+from collections import Counter
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
@@ -1011,10 +1012,7 @@ def fetch_fulltexts_for_jsonl(
                                f"Skipped: {skipped_with_fulltext}")
         manifest_stats = _manifest_stats(entries)
         elapsed = time.time() - start_time
-        status_counts = {}
-        for e in entries:
-            status = e.get("pmc_status", "unknown")
-            status_counts[status] = status_counts.get(status, 0) + 1
+        status_counts = Counter(e.get("pmc_status", "unknown") for e in entries)
         fulltext_count = manifest_stats["full_text_with_body"]
         abstract_only = manifest_stats["abstract_only_final"]
         total_bytes_saved = 0
@@ -1055,7 +1053,7 @@ def fetch_fulltexts_for_jsonl(
         logger.info(f"  - HTML extractions: {manifest_stats.get('unpaywall_html_count', 0)}")
         logger.info(f"  - DOI landing page fallback: {manifest_stats.get('unpaywall_doi_fallback_count', 0)}")
         logger.info(f"  - Aggressive scraping: {manifest_stats.get('unpaywall_aggressive_count', 0)}")
-        logger.info(f"Status breakdown: {status_counts}")
+        logger.info(f"Status breakdown: {dict(status_counts)}")
         logger.info(f"Lift → PMC:{lift['pmc']}  EPMC:{lift['epmc']}  UPW(pdf):{lift['upw_pdf']}  UPW(html):{lift['upw_html']}  SCRAPE(pdf):{lift['scrape_pdf']}  SCRAPE(html):{lift['scrape_html']}")
         logger.info(f"Estimated storage: {manifest['storage_estimate_mb']} MB")
         return manifest
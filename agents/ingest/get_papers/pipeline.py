@@ -8,16 +8,28 @@ No LLM calls - pure rule-based processing with diversity filtering.
 import os
 import sys
 import time
+import heapq
+import queue
+import threading
+import multiprocessing as mp
 import argparse
 import logging
 import datetime
+from itertools import islice
+from collections import Counter, deque
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from evidentfit_shared.utils import PROJECT_ROOT
 # Add the parent directory to the path so we can import from get_papers
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from get_papers.pubmed_client import multi_supplement_search, pubmed_efetch_xml, pubmed_esearch, PM_SEARCH_QUERY
+from get_papers.pubmed_client import (
+    multi_supplement_search,
+    pubmed_efetch_xml_batches,
+    esearch_all_pmids,
+    PM_SEARCH_QUERY,
+    EFETCH_CONCURRENCY,
+)
 from get_papers.parsing import parse_pubmed_article
 from get_papers.diversity import (
     analyze_combination_distribution, 
@@ -25,9 +37,11 @@ from get_papers.diversity import (
     calculate_combination_score,
     iterative_diversity_filtering,  # kept for existing callers
     iterative_diversity_filtering_with_protection,
+    _iterative_diversity_filtering_internal,
     compute_minimum_quota_ids,
     compute_enhanced_quota_ids,
-    should_run_iterative_diversity
+    should_run_iterative_diversity,
+    split_supplements,
 )
 from get_papers.storage import (
     create_run_dir,
@@ -65,6 +79,12 @@ USE_ENHANCED_QUOTAS = os.getenv("USE_ENHANCED_QUOTAS", "true").lower() == "true"
 MIN_OVERALL_PER_SUPPLEMENT = int(os.getenv("MIN_OVERALL_PER_SUPPLEMENT", "10"))
 MIN_PER_SUPPLEMENT_GOAL = int(os.getenv("MIN_PER_SUPPLEMENT_GOAL", "2"))
 
+# efetch batching: PMIDs per request, and how many fetched batches may wait for parsing
+EFETCH_BATCH_SIZE = int(os.getenv("EFETCH_BATCH_SIZE", "200"))
+EFETCH_QUEUE_SIZE = int(os.getenv("EFETCH_QUEUE_SIZE", "4"))
+# Record parsing processes (0 = auto: min(8, max(1, cpu_count()-1)); 1 = parse inline)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+
 
 def setup_logging() -> logging.Logger:
     """Setup logging for the pipeline"""
@@ -130,7 +150,7 @@ def update_watermark() -> None:
     watermark_file = (PROJECT_ROOT / "data" / "ingest" / "watermark.json")
     watermark_file.parent.mkdir(parents=True, exist_ok=True)
     
-    now_iso = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+    now_iso = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     watermark_data = {
         "last_ingest_iso": now_iso,
         "updated_at": now_iso
@@ -167,19 +187,12 @@ def fetch_papers(mode: str) -> List[str]:
             mindate = thirty_days_ago.strftime("%Y/%m/%d")
         
         logger.info(f"Monthly mode: Searching for papers since {mindate}")
-        ids = []
-        retstart = 0
-        
-        while len(ids) < 3000:  # Reasonable limit for monthly updates
-            batch = pubmed_esearch(PM_SEARCH_QUERY, mindate=mindate, retmax=200, retstart=retstart)
-            idlist = batch.get("esearchresult", {}).get("idlist", [])
-            if not idlist:
-                break
-            ids.extend(idlist)
-            retstart += len(idlist)
-            if retstart >= int(batch["esearchresult"].get("count", "0")):
-                break
-            time.sleep(1.0)  # Rate limiting
+        # First page gives the count; remaining pages are fetched concurrently (rate-limited)
+        ids, failed_batches = esearch_all_pmids(PM_SEARCH_QUERY, mindate=mindate,
+                                                limit=3000,  # Reasonable limit for monthly updates
+                                                label="monthly search")
+        if failed_batches:
+            logger.warning(f"Monthly search: {len(failed_batches)} page(s) failed at retstart {failed_batches}")
         
         logger.info(f"Monthly: Found {len(ids)} new PMIDs since last run")
     
@@ -192,6 +205,20 @@ def fetch_papers(mode: str) -> List[str]:
     return ids
 
 
+def _parse_record(rec: Dict) -> Optional[Dict]:
+    """parse_pubmed_article for one record; a malformed record is logged and skipped rather than failing its batch"""
+    try:
+        return parse_pubmed_article(rec, None)
+    except Exception as e:
+        pmid = None
+        if isinstance(rec, dict):
+            pmid = (rec.get("MedlineCitation") or {}).get("PMID")
+            if isinstance(pmid, dict):
+                pmid = pmid.get("#text")
+        logger.error(f"Error parsing PMID {pmid or 'unknown'}: {e}")
+        return None
+
+
 def process_papers(ids: List[str], mode: str) -> List[Dict]:
     """
     Process PMIDs through fetch → parse → score
@@ -207,45 +234,108 @@ def process_papers(ids: List[str], mode: str) -> List[Dict]:
     total_processed = 0
     seen_pmids = set()
     
-    logger.info(f"Processing {len(ids)} PMIDs in batches of 50...")
+    logger.info(f"Processing {len(ids)} PMIDs in batches of {EFETCH_BATCH_SIZE}...")
     
-    for i in range(0, len(ids), 50):
-        pid_batch = ids[i:i+50]
-        
+    # Fetch runs in a background thread so efetch (network + rate-limit spacing) overlaps
+    # with parsing. Each window of EFETCH_CONCURRENCY batches is fetched concurrently and
+    # queued in batch order; the bounded queue caps how much XML is held in memory.
+    fetch_q: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=EFETCH_QUEUE_SIZE)
+    
+    def fetch_worker() -> None:
+        # Batches and windows are cut lazily from one iterator over ids (no up-front slicing)
+        pid_iter = iter(ids)
+        pid_batches = iter(lambda: list(islice(pid_iter, EFETCH_BATCH_SIZE)), [])
+        batch_no = 0
         try:
-            xml = pubmed_efetch_xml(pid_batch)
+            for window in iter(lambda: list(islice(pid_batches, EFETCH_CONCURRENCY)), []):
+                try:
+                    results = pubmed_efetch_xml_batches(window)
+                except Exception as e:
+                    results = [e] * len(window)
+                for xml in results:
+                    batch_no += 1
+                    fetch_q.put((batch_no, xml))
+        finally:
+            fetch_q.put(None)  # Sentinel: no more batches
+    
+    # Parsing is pure-Python CPU work per record, so spread each batch across worker
+    # processes. The pool is forked before the fetch thread starts. Up to
+    # EFETCH_QUEUE_SIZE batches are in the pool at once (so workers never idle waiting
+    # on one batch's stragglers); results are still collected in batch order.
+    workers = PARSE_WORKERS if PARSE_WORKERS > 0 else max(1, min(8, (os.cpu_count() or 1) - 1))
+    pool = mp.Pool(processes=workers) if workers > 1 else None
+    pending: "deque[tuple]" = deque()
+    
+    def collect(parsed: List[Optional[Dict]]) -> None:
+        nonlocal total_processed
+        for d in parsed:
+            if d is None:
+                continue  # Skip irrelevant studies
+            if not d["title"] and not d["content"]:
+                continue
             
-            # Handle case where PubMed API returns string instead of XML
-            if isinstance(xml, str):
-                logger.warning(f"PubMed API returned string instead of XML for batch {i//50 + 1}, skipping...")
+            # Prevent duplicate docs across chunk boundaries
+            pmid = d.get("pmid")
+            if not pmid or pmid in seen_pmids:
                 continue
+            seen_pmids.add(pmid)
+            
+            all_docs.append(d)
+            total_processed += 1
+            
+            if total_processed % 100 == 0:
+                logger.info(f"Processed {total_processed} papers...")
+    
+    def drain(keep: int) -> None:
+        # Collect the oldest in-flight batches until at most `keep` remain
+        while len(pending) > keep:
+            batch_no, result = pending.popleft()
+            try:
+                collect(result.get())
+            except Exception as e:
+                logger.error(f"Error processing batch {batch_no}: {e}")
+    
+    fetcher = threading.Thread(target=fetch_worker, name="efetch", daemon=True)
+    fetcher.start()
+    
+    try:
+        while True:
+            item = fetch_q.get()
+            if item is None:
+                break
+            batch_no, xml = item
+            
+            try:
+                if isinstance(xml, BaseException):
+                    raise xml
                 
-            arts = xml.get("PubmedArticleSet", {}).get("PubmedArticle", [])
-            if isinstance(arts, dict):
-                arts = [arts]
-
-            for rec in arts:
-                d = parse_pubmed_article(rec, None)  # No dynamic weights initially
-                if d is None:
-                    continue  # Skip irrelevant studies
-                if not d["title"] and not d["content"]:
-                    continue
-                
-                # Prevent duplicate docs across chunk boundaries
-                pmid = d.get("pmid")
-                if not pmid or pmid in seen_pmids:
+                # Handle case where PubMed API returns string instead of XML
+                if isinstance(xml, str):
+                    logger.warning(f"PubMed API returned string instead of XML for batch {batch_no}, skipping...")
                     continue
-                seen_pmids.add(pmid)
-                
-                all_docs.append(d)
-                total_processed += 1
-                
-                if total_processed % 100 == 0:
-                    logger.info(f"Processed {total_processed} papers...")
-        
-        except Exception as e:
-            logger.error(f"Error processing batch {i//50 + 1}: {e}")
-            continue
+                    
+                arts = xml.get("PubmedArticleSet", {}).get("PubmedArticle", [])
+                if isinstance(arts, dict):
+                    arts = [arts]
+
+                # No dynamic weights initially
+                if pool is not None:
+                    pending.append((batch_no, pool.map_async(_parse_record, arts,
+                                                             chunksize=max(1, len(arts) // workers))))
+                    drain(EFETCH_QUEUE_SIZE)
+                else:
+                    collect([_parse_record(rec) for rec in arts])
+            
+            except Exception as e:
+                logger.error(f"Error processing batch {batch_no}: {e}")
+                continue
+        drain(0)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    
+    fetcher.join()
     
     logger.info(f"Successfully processed {len(all_docs)} papers from {len(ids)} PMIDs")
     
@@ -315,6 +405,12 @@ def apply_quality_filter(docs: List[Dict], mode: str) -> List[Dict]:
     return filtered_docs
 
 
+def _iter_supplements(docs):
+    """Yield each stripped, non-empty supplement name across docs (for tallies)."""
+    for doc in docs:
+        yield from split_supplements(doc.get("supplements") or "")
+
+
 def apply_diversity_selection(docs: List[Dict], target_count: int, protected_ids: Optional[set] = None) -> List[Dict]:
     """
     Apply diversity-based selection
@@ -328,34 +424,44 @@ def apply_diversity_selection(docs: List[Dict], target_count: int, protected_ids
     """
     logger.info(f"Applying diversity selection to {len(docs)} papers (target: {target_count})...")
     
-    # Calculate combination weights
-    combinations = analyze_combination_distribution(docs)
-    combination_weights = calculate_combination_weights(combinations, len(docs))
-    
-    # Add combination scores to all papers
-    for doc in docs:
-        combination_score = calculate_combination_score(doc, combination_weights)
-        doc["combination_score"] = combination_score
-        doc["enhanced_score"] = doc.get("reliability_score", 0) + combination_score
-    
     # Use threshold for diversity selection
     total_docs = len(docs)
     threshold = DIVERSITY_ROUNDS_THRESHOLD
     run_div = should_run_iterative_diversity(total_docs, threshold)
     
-    if run_div:
+    if run_div and total_docs > target_count:
         logger.info(f"Iterative diversity ON (total={total_docs:,} > threshold={threshold:,}); selecting → {target_count:,}")
-        selected_docs = iterative_diversity_filtering_with_protection(
+        # The filter's first round derives these same weights from the full set and scores
+        # every paper with them, so no separate scoring pass is needed here
+        selected_docs = _iterative_diversity_filtering_internal(
             papers=docs,
             target_count=target_count,
             elimination_per_round=5000,  # Larger elimination rounds for 50K target
             protected_ids=protected_ids or set(),
         )
     else:
-        logger.info(f"Iterative diversity OFF (total={total_docs:,} <= threshold={threshold:,}); using top-K by enhanced_score")
-        # Sort by enhanced score and take top papers
-        docs.sort(key=lambda x: x.get("enhanced_score", 0), reverse=True)
-        selected_docs = docs[:target_count]
+        if run_div:
+            logger.info(f"Iterative diversity ON but nothing to eliminate (total={total_docs:,} <= target={target_count:,})")
+        else:
+            logger.info(f"Iterative diversity OFF (total={total_docs:,} <= threshold={threshold:,}); using top-K by enhanced_score")
+        
+        # Calculate combination weights
+        combinations = analyze_combination_distribution(docs)
+        combination_weights = calculate_combination_weights(combinations, len(docs))
+        
+        # Add combination scores to all papers, keeping enhanced scores in a parallel list
+        # so top-K selection ranks plain floats by position instead of re-reading dicts
+        enhanced_scores = []
+        for doc in docs:
+            combination_score = calculate_combination_score(doc, combination_weights)
+            enhanced = doc.get("reliability_score", 0) + combination_score
+            doc["combination_score"] = combination_score
+            doc["enhanced_score"] = enhanced
+            enhanced_scores.append(enhanced)
+        
+        # Take top papers by enhanced score (O(N log K) heap; same order as a stable sort)
+        top_idx = heapq.nlargest(target_count, range(len(docs)), key=enhanced_scores.__getitem__)
+        selected_docs = [docs[i] for i in top_idx]
     
     # Summary log after selection
     gated_count = sum(1 for doc in selected_docs if doc.get("combination_score", 0) == 0)
@@ -368,19 +474,11 @@ def apply_diversity_selection(docs: List[Dict], target_count: int, protected_ids
     pct_goal_specific = round(100.0 * goal_specific_count / len(selected_docs), 2)
     
     # Top 10 supplements
-    supplement_counts = {}
-    for doc in selected_docs:
-        supplements = (doc.get("supplements") or "").split(",")
-        for supp in supplements:
-            if supp.strip():
-                supplement_counts[supp.strip()] = supplement_counts.get(supp.strip(), 0) + 1
-    top_supplements = sorted(supplement_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    supplement_counts = Counter(_iter_supplements(selected_docs))
+    top_supplements = supplement_counts.most_common(10)
     
     # Study type distribution
-    study_type_counts = {}
-    for doc in selected_docs:
-        study_type = doc.get("study_type", "other")
-        study_type_counts[study_type] = study_type_counts.get(study_type, 0) + 1
+    study_type_counts = Counter(doc.get("study_type", "other") for doc in selected_docs)
     
     # Quality distribution
     quality_counts = {"4.0+": 0, "3.0-3.9": 0, "2.0-2.9": 0, "<2.0": 0}
@@ -396,22 +494,20 @@ def apply_diversity_selection(docs: List[Dict], target_count: int, protected_ids
             quality_counts["<2.0"] += 1
     
     # Top supplement-goal combinations
-    combo_counts = {}
-    for doc in selected_docs[:100]:  # Sample first 100
-        supplements = (doc.get("supplements") or "").split(",")
-        goal = doc.get("primary_goal", "")
-        for supp in supplements:
-            if supp.strip() and goal:
-                key = f"{supp.strip()}_{goal}"
-                combo_counts[key] = combo_counts.get(key, 0) + 1
-    top_combos = sorted(combo_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    combo_counts = Counter(
+        (supp, doc["primary_goal"])
+        for doc in selected_docs[:100]  # Sample first 100
+        if doc.get("primary_goal")
+        for supp in _iter_supplements((doc,))
+    )
+    top_combos = combo_counts.most_common(10)
     
     logger.info(f"Sanity checks:")
     logger.info(f"  Goal-specific papers: {pct_goal_specific}% ({goal_specific_count}/{len(selected_docs)})")
     logger.info(f"  Top supplements: {[f'{s}({c})' for s, c in top_supplements[:5]]}")
-    logger.info(f"  Study types: {dict(sorted(study_type_counts.items(), key=lambda x: x[1], reverse=True))}")
+    logger.info(f"  Study types: {dict(study_type_counts.most_common())}")
     logger.info(f"  Quality distribution: {quality_counts}")
-    logger.info(f"  Top combos: {[f'{c}({n})' for c, n in top_combos[:5]]}")
+    logger.info(f"  Top combos: {[f'{s}_{g}({n})' for (s, g), n in top_combos[:5]]}")
     
     return selected_docs
 
@@ -423,25 +519,17 @@ def print_dry_report(selected_docs: List[Dict]) -> None:
     print("=" * 50)
     
     # Count by study category
-    category_counts = {}
-    for doc in selected_docs:
-        category = doc.get("study_category", "other")
-        category_counts[category] = category_counts.get(category, 0) + 1
+    category_counts = Counter(doc.get("study_category", "other") for doc in selected_docs)
     
     print("\nStudy Categories:")
-    for category, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True):
+    for category, count in category_counts.most_common():
         print(f"  {category}: {count}")
     
     # Top supplements
-    supplement_counts = {}
-    for doc in selected_docs:
-        supplements = (doc.get("supplements") or "").split(",")
-        for supp in supplements:
-            if supp.strip():
-                supplement_counts[supp.strip()] = supplement_counts.get(supp.strip(), 0) + 1
+    supplement_counts = Counter(_iter_supplements(selected_docs))
     
     print("\nTop 10 Supplements:")
-    for supp, count in sorted(supplement_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
+    for supp, count in supplement_counts.most_common(10):
         print(f"  {supp}: {count}")
     
     # Combination score stats
@@ -586,30 +674,23 @@ def main():
         papers_file = save_selected_papers(selected_docs, run_dir)
 
         # ---- Build protected-quota report (how many reserved actually made it) ----
-        from collections import Counter
-
         def _supp_list(doc):
-            raw = (doc.get("supplements") or "").split(",")
-            return [s.strip() for s in raw if s.strip()]
+            return split_supplements(doc.get("supplements") or "")
 
-        # Map doc_id -> supplements using the full parsed pool (so we can attribute protected IDs)
-        id_to_supps = {}
-        for d in all_docs:
-            if d.get("id"):
-                id_to_supps[d["id"]] = _supp_list(d)
+        # Map protected doc_id -> supplements using the full parsed pool (so we can attribute
+        # protected IDs); only protected docs are ever looked up, so only they are split
+        id_to_supps = {d["id"]: _supp_list(d) for d in all_docs if d.get("id") in protected_ids}
 
         # Totals reserved per supplement (in protected set), and how many of those survived to final
         reserved_per_supp = Counter()
-        for pid in protected_ids:
-            for s in id_to_supps.get(pid, []):
-                reserved_per_supp[s] += 1
+        for supps in id_to_supps.values():
+            reserved_per_supp.update(supps)
 
         kept_protected_ids = {d.get("id") for d in selected_docs if d.get("id") in protected_ids}
         kept_per_supp = Counter()
         for d in selected_docs:
             if d.get("id") in kept_protected_ids:
-                for s in _supp_list(d):
-                    kept_per_supp[s] += 1
+                kept_per_supp.update(_supp_list(d))
 
         protected_report = {
             "protected_total_reserved": len(protected_ids),
@@ -628,7 +709,7 @@ def main():
         # Log a brief summary
         logger.info(f"Protected quota - kept {protected_report['protected_total_kept']} of {protected_report['protected_total_reserved']} reserved IDs")
         # Show top 10 supplements by reserved count
-        top_reserved = sorted(protected_report["per_supplement"].items(), key=lambda kv: kv[1]["reserved"], reverse=True)[:10]
+        top_reserved = heapq.nlargest(10, protected_report["per_supplement"].items(), key=lambda kv: kv[1]["reserved"])
         logger.info(f"Protected quota (top by reserved): { {k: v for k, v in top_reserved} }")
 
         # Create and save metadata (include stage counts so metadata.json shows pre-diversity numbers)
@@ -694,34 +775,30 @@ def main():
                         temp_dir = Path(tempfile.gettempdir())
                         combined_papers = temp_dir / f"combined_papers_{run_id}.jsonl"
                         
-                        # Combine papers (dedupe by PMID)
-                        seen_pmids = set()
-                        with open(combined_papers, 'w', encoding='utf-8') as out_f:
-                            # Write new papers first
-                            with open(papers_file, 'r', encoding='utf-8') as in_f:
+                        # Combine papers (dedupe by PMID): new papers first so their copy of a
+                        # PMID wins; the previous corpus streams straight to disk and only its
+                        # PMIDs are kept in memory
+                        def _pmid_lines(path):
+                            with open(path, 'r', encoding='utf-8') as in_f:
                                 for line in in_f:
                                     try:
-                                        paper = json.loads(line)
-                                        pmid = paper.get("pmid")
-                                        if pmid and pmid not in seen_pmids:
-                                            seen_pmids.add(pmid)
-                                            out_f.write(line)
+                                        pmid = json.loads(line).get("pmid")
                                     except:
-                                        pass
-                            
-                            # Add previous papers (not already in new set)
-                            with open(prev_papers_path, 'r', encoding='utf-8') as in_f:
-                                for line in in_f:
-                                    try:
-                                        paper = json.loads(line)
-                                        pmid = paper.get("pmid")
-                                        if pmid and pmid not in seen_pmids:
-                                            seen_pmids.add(pmid)
-                                            out_f.write(line)
-                                    except:
-                                        pass
+                                        continue
+                                    if pmid:
+                                        yield pmid, line
                         
-                        logger.info(f"Combined {len(seen_pmids)} unique papers for fulltext fetch")
+                        unique_lines: Dict[str, Optional[str]] = {}
+                        for pmid, line in _pmid_lines(papers_file):
+                            unique_lines.setdefault(pmid, line)
+                        with open(combined_papers, 'w', encoding='utf-8') as out_f:
+                            out_f.writelines(unique_lines.values())
+                            for pmid, line in _pmid_lines(prev_papers_path):
+                                if pmid not in unique_lines:
+                                    unique_lines[pmid] = None
+                                    out_f.write(line)
+                        
+                        logger.info(f"Combined {len(unique_lines)} unique papers for fulltext fetch")
                         papers_to_fetch = combined_papers
                     else:
                         logger.info("No previous run found or same as current, fetching new papers only")
@@ -785,15 +862,9 @@ def main():
         logger.info(f"Latest pointer: {RUNS_BASE_DIR / 'latest.json'}")
         
         # Show final distribution
-        supplement_counts = {}
-        for doc in selected_docs:
-            supplements = doc.get("supplements", "").split(",") if doc.get("supplements") else []
-            for supp in supplements:
-                supp = supp.strip()
-                if supp:
-                    supplement_counts[supp] = supplement_counts.get(supp, 0) + 1
+        supplement_counts = Counter(_iter_supplements(selected_docs))
         
-        logger.info(f"Top supplements: {dict(sorted(supplement_counts.items(), key=lambda x: x[1], reverse=True)[:10])}")
+        logger.info(f"Top supplements: {dict(supplement_counts.most_common(10))}")
         
         # Show quality distribution
         quality_dist = {"4.0+": 0, "3.0-3.9": 0, "2.0-2.9": 0, "<2.0": 0}
@@ -811,7 +882,7 @@ def main():
         logger.info(f"Quality distribution: {quality_dist}")
         
         # Show top enhanced scores
-        top_scores = [d.get("enhanced_score", 0) for d in selected_docs[:5]]
+        top_scores = heapq.nlargest(5, (d.get("enhanced_score", 0) for d in selected_docs))
         logger.info(f"Top enhanced scores: {top_scores}")
         
         logger.info("=" * 60)
@@ -18,14 +18,31 @@ to bypass the 10K result limit. No LLM calls - pure data fetching.
 """
 
 import os
+import re
 import time
+import atexit
+import threading
+import asyncio
 import math
 import json
+import hashlib
 import logging
 import httpx
 import xmltodict
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
+from evidentfit_shared.utils import PROJECT_ROOT
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads  # stdlib fallback
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None  # falls back to xmltodict.parse
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +51,67 @@ NCBI_EMAIL = os.getenv("NCBI_EMAIL", "you@example.com")
 NCBI_API_KEY = os.getenv("NCBI_API_KEY")  # optional
 MAX_TOTAL_PAPERS = int(os.getenv("MAX_TOTAL_PAPERS", "200000"))
 
+# E-utilities request starts are spaced by RATE_LIMIT_DELAY (~3/sec without key, ~9/sec with key)
+RATE_LIMIT_DELAY = 0.34 if not NCBI_API_KEY else 0.11
+EFETCH_CONCURRENCY = int(os.getenv("EFETCH_CONCURRENCY", "3" if not NCBI_API_KEY else "8"))
+EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+ESEARCH_CONCURRENCY = int(os.getenv("ESEARCH_CONCURRENCY", "3" if not NCBI_API_KEY else "8"))
+ESEARCH_PAGE_SIZE = 200
+ESEARCH_MAX_RESULTS = 9999  # PubMed only pages through the first 9,999 hits of a query
+
+class _RequestSpacer:
+    """
+    Thread-safe minimum spacing between request starts (a token bucket of depth 1)
+    
+    acquire() blocks only for whatever is left of the interval since the previous
+    request, instead of a fixed sleep before every call.
+    """
+    
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+    
+    def _reserve(self) -> float:
+        """Claim the next start slot; returns how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        return wait
+    
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Shared by every ESearch/EFetch call, sync or async and across threads:
+# ~3 req/s without an API key, ~9 req/s with one
+_RATE_LIMITER = _RequestSpacer(RATE_LIMIT_DELAY)
+
+# Shared sync client for pubmed_esearch/pubmed_efetch_xml: keeps connections (and their
+# TLS sessions) alive across calls instead of a new handshake per request
+_HTTPX_CLIENT = httpx.Client(
+    timeout=60,
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+)
+atexit.register(_HTTPX_CLIENT.close)
+
+# Optional on-disk cache of ESearch result counts, so re-runs skip the count round trips
+# (counts for a fixed query barely move within a few hours); off unless a TTL is set
+ESEARCH_COUNT_CACHE = PROJECT_ROOT / os.getenv("ESEARCH_COUNT_CACHE", "data/ingest/esearch_counts.json")
+ESEARCH_COUNT_CACHE_TTL = float(os.getenv("ESEARCH_COUNT_CACHE_TTL_HOURS", "0")) * 3600
+
+# Control characters occasionally embedded in ESearch JSON responses
+CONTROL_CHARS_RE = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
 # Disease/condition exclusion filter for relatively healthy populations
 # Excludes clinical/disease populations while keeping obesity, elderly, and prevention studies
 DISEASE_EXCLUSION_FILTER = ' NOT (cancer OR neoplasm OR tumor OR carcinoma OR oncology OR chemotherapy OR "heart disease" OR "heart failure" OR "coronary artery" OR "myocardial infarction" OR "cardiac disease" OR "kidney disease" OR "renal disease" OR "renal failure" OR dialysis OR "chronic kidney" OR "liver disease" OR cirrhosis OR hepatitis OR "hepatic disease" OR diabetes OR diabetic OR "insulin resistance" OR "glucose intolerance" OR prediabetes OR "type 1 diabetes" OR "type 2 diabetes" OR hyperglycemia OR Parkinson OR Alzheimer OR dementia OR "multiple sclerosis" OR epilepsy OR "traumatic brain injury" OR "chronic obstructive" OR COPD OR HIV OR AIDS OR "immune deficiency" OR children OR pediatric OR adolescent OR "under 18" OR minors OR juvenile OR pregnancy OR pregnant OR lactation OR breastfeeding OR "breast feeding" OR maternal OR prenatal OR postnatal OR "Case Reports"[Publication Type])'
@@ -129,21 +207,9 @@ PM_SEARCH_QUERY = os.getenv("PM_SEARCH_QUERY") or \
     '(creatine OR "beta-alanine" OR caffeine OR citrulline OR nitrate OR "nitric oxide" OR HMB OR "branched chain amino acids" OR BCAA OR tribulus OR "d-aspartic acid" OR betaine OR taurine OR carnitine OR ZMA OR glutamine OR CLA OR ecdysterone OR "deer antler" OR "whey protein" OR "protein supplementation") AND (resistance OR "strength training" OR "1RM" OR hypertrophy OR "lean mass" OR "muscle mass" OR "exercise" OR "athletic performance") AND (humans[MeSH] OR adult OR adults OR participants OR subjects OR volunteers OR athletes) NOT ("nitrogen dioxide" OR NO2 OR pollution OR "cardiac hypertrophy" OR "ventricular hypertrophy" OR "fish" OR "rat" OR "mice" OR "mouse" OR "in vitro" OR "cell culture" OR animals[MeSH])' + DISEASE_EXCLUSION_FILTER
 
 
-def pubmed_esearch(term: str, mindate: Optional[str] = None, maxdate: Optional[str] = None, 
-                   retmax: int = 200, retstart: int = 0) -> Dict:
-    """
-    Search PubMed using ESearch API with retry logic
-    
-    Args:
-        term: Search query
-        mindate: Minimum publication date (YYYY/MM/DD format)
-        maxdate: Maximum publication date (YYYY/MM/DD format)
-        retmax: Maximum number of results to return
-        retstart: Starting position for results
-        
-    Returns:
-        Dictionary with search results
-    """
+def _esearch_params(term: str, mindate: Optional[str], maxdate: Optional[str],
+                    retmax: int, retstart: int, usehistory: bool = False) -> Dict[str, str]:
+    """Build ESearch query parameters"""
     params = {
         "db": "pubmed",
         "retmode": "json",
@@ -153,6 +219,9 @@ def pubmed_esearch(term: str, mindate: Optional[str] = None, maxdate: Optional[s
         "email": NCBI_EMAIL
     }
     
+    if usehistory:
+        params["usehistory"] = "y"
+    
     if NCBI_API_KEY:
         params["api_key"] = NCBI_API_KEY
         
@@ -162,27 +231,126 @@ def pubmed_esearch(term: str, mindate: Optional[str] = None, maxdate: Optional[s
             params["mindate"] = mindate
         if maxdate:
             params["maxdate"] = maxdate
+    return params
+
+
+def _element_to_dict(elem) -> Any:
+    """
+    Convert an lxml element to the same structure xmltodict.parse produces
+    
+    Attributes become "@name" keys, repeated children become lists, and an element's
+    own text (stripped, tails of children included) is "#text" when it also has
+    attributes or children, else the value itself (None when empty).
+    """
+    item: Dict[str, Any] = {"@" + k: v for k, v in elem.attrib.items()}
+    parts = [elem.text] if elem.text else []
+    for child in elem:
+        if isinstance(child.tag, str):  # skip comments / processing instructions
+            name = child.tag
+            value = _element_to_dict(child)
+            if name not in item:
+                item[name] = value
+            elif isinstance(item[name], list):
+                item[name].append(value)
+            else:
+                item[name] = [item[name], value]
+        if child.tail:
+            parts.append(child.tail)
+    text = "".join(parts).strip() or None
+    if not item:
+        return text
+    if text:
+        item["#text"] = text
+    return item
+
+
+class _EfetchStreamParser:
+    """
+    Incrementally parse EFetch XML into {"PubmedArticleSet": {"PubmedArticle": [...]}}
+    
+    Response bytes are fed in as they arrive; lxml's pull parser emits each
+    PubmedArticle as soon as its closing tag is seen, which is converted to the
+    xmltodict layout parse_pubmed_article expects and then cleared, so neither the
+    full response body nor the full element tree is held at once. Without lxml the
+    chunks are buffered and handed to xmltodict.parse on close(). Any other root
+    (e.g. an eFetchResult error body) raises ValueError instead of passing as an
+    empty batch.
+    """
+    
+    def __init__(self) -> None:
+        self.articles: List[Any] = []
+        self._chunks: List[bytes] = []
+        self._parser = None
+        if etree is not None:
+            self._parser = etree.XMLPullParser(events=("end",), tag="PubmedArticle",
+                                               resolve_entities=False, no_network=True)
+    
+    def feed(self, chunk: bytes) -> None:
+        if self._parser is None:
+            self._chunks.append(chunk)
+            return
+        self._parser.feed(chunk)
+        self._drain()
+    
+    def close(self) -> Dict:
+        if self._parser is None:
+            parsed = xmltodict.parse(b"".join(self._chunks))
+            root = next(iter(parsed), "")
+            if root != "PubmedArticleSet":
+                raise ValueError(f"EFetch returned <{root}> instead of PubmedArticleSet: {str(parsed[root])[:200]}")
+            return parsed
+        root = self._parser.close()
+        self._drain()
+        if root.tag != "PubmedArticleSet":
+            raise ValueError(f"EFetch returned <{root.tag}> instead of PubmedArticleSet: "
+                             f"{' '.join(''.join(root.itertext()).split())[:200]}")
+        return {"PubmedArticleSet": {"PubmedArticle": self.articles}}
+    
+    def _drain(self) -> None:
+        for _, elem in self._parser.read_events():
+            self.articles.append(_element_to_dict(elem))
+            elem.clear()
+            # Drop already-converted siblings so the root doesn't accumulate them
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+
+def pubmed_esearch(term: str, mindate: Optional[str] = None, maxdate: Optional[str] = None, 
+                   retmax: int = 200, retstart: int = 0, usehistory: bool = False) -> Dict:
+    """
+    Search PubMed using ESearch API with retry logic
+    
+    Args:
+        term: Search query
+        mindate: Minimum publication date (YYYY/MM/DD format)
+        maxdate: Maximum publication date (YYYY/MM/DD format)
+        retmax: Maximum number of results to return
+        retstart: Starting position for results
+        usehistory: Post the result set to the history server (adds webenv/querykey)
+        
+    Returns:
+        Dictionary with search results
+    """
+    params = _esearch_params(term, mindate, maxdate, retmax, retstart, usehistory)
     
     # Retry logic for timeouts and transient errors
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            # Rate limiting - 1 second between requests
-            time.sleep(1.0)
+            # Rate limiting - space request starts to stay under NCBI's per-second cap
+            _RATE_LIMITER.acquire()
             
-            with httpx.Client(timeout=60) as client:
-                response = client.get("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi", params=params)
-                response.raise_for_status()
-                
-                try:
-                    return response.json()
-                except Exception as e:
-                    logger.error(f"JSON decode error: {e}")
-                    logger.error(f"Response content: {response.text[:500]}...")
-                    # Try to clean the response
-                    import re
-                    cleaned_text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', response.text)
-                    return json.loads(cleaned_text)
+            response = _HTTPX_CLIENT.get(ESEARCH_URL, params=params)
+            response.raise_for_status()
+            
+            try:
+                return _json_loads(response.content)
+            except Exception as e:
+                logger.error(f"JSON decode error: {e}")
+                logger.error(f"Response content: {response.text[:500]}...")
+                # Try to clean the response
+                cleaned_text = CONTROL_CHARS_RE.sub('', response.text)
+                return json.loads(cleaned_text)
                     
         except Exception as e:
             if attempt < max_retries - 1:
@@ -225,17 +393,19 @@ def pubmed_efetch_xml(pmids: List[str]) -> Dict:
     if NCBI_API_KEY:
         params["api_key"] = NCBI_API_KEY
     
-    # Rate limiting - 1 second between requests
-    time.sleep(1.0)
-    
     # Retry logic for PubMed API
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            with httpx.Client(timeout=120) as client:
-                response = client.get("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi", params=params)
+            # Rate limiting - space request starts to stay under NCBI's per-second cap
+            _RATE_LIMITER.acquire()
+            parser = _EfetchStreamParser()
+            # POST keeps 200-id batches clear of URL length limits (NCBI recommends it for long id lists)
+            with _HTTPX_CLIENT.stream("POST", EFETCH_URL, data=params, timeout=120) as response:
                 response.raise_for_status()
-                return xmltodict.parse(response.text)
+                for chunk in response.iter_bytes():
+                    parser.feed(chunk)
+            return parser.close()
         except Exception as e:
             if attempt < max_retries - 1:
                 # Check if it's a 429 rate limit error
@@ -253,58 +423,348 @@ def pubmed_efetch_xml(pmids: List[str]) -> Dict:
                 raise
 
 
-def search_supplement_simple(query: str, mindate: Optional[str] = None) -> List[str]:
+async def _pubmed_efetch_xml_async(client: httpx.AsyncClient, pmids: List[str]) -> Dict:
+    """Async EFetch for one PMID batch (same retry policy as pubmed_efetch_xml, honors Retry-After on 429)"""
+    params = {
+        "db": "pubmed",
+        "retmode": "xml",
+        "id": ",".join(pmids),
+        "email": NCBI_EMAIL
+    }
+    
+    if NCBI_API_KEY:
+        params["api_key"] = NCBI_API_KEY
+    
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            # Serialize request starts so concurrent batches stay under NCBI's rate limit
+            await _RATE_LIMITER.acquire_async()
+            # Parse as bytes arrive, so CPU work overlaps the rest of the download
+            parser = _EfetchStreamParser()
+            async with client.stream("POST", EFETCH_URL, data=params) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    parser.feed(chunk)
+            return parser.close()
+        except Exception as e:
+            if attempt < max_retries - 1:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                    retry_after = e.response.headers.get("Retry-After", "")
+                    wait_time = float(retry_after) if retry_after.isdigit() else (attempt + 1) * 10
+                    logger.warning(f"PubMed rate limit hit (attempt {attempt + 1}/{max_retries}): {e}")
+                    logger.warning(f"Waiting {wait_time} seconds before retry...")
+                else:
+                    wait_time = (attempt + 1) * 5  # Standard exponential backoff
+                    logger.warning(f"PubMed API error (attempt {attempt + 1}/{max_retries}): {e}")
+                    logger.warning(f"Retrying in {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+            else:
+                logger.error(f"PubMed API failed after {max_retries} attempts: {e}")
+                raise
+
+
+def pubmed_efetch_xml_batches(pmid_batches: List[List[str]], max_concurrency: int = EFETCH_CONCURRENCY) -> List[Any]:
     """
-    Simple search for supplements with <10K results
+    Fetch several EFetch batches concurrently over one shared AsyncClient
     
     Args:
-        query: PubMed search query
-        mindate: Minimum publication date
+        pmid_batches: List of PMID batches (one EFetch request each)
+        max_concurrency: Maximum in-flight requests
         
     Returns:
-        List of PMIDs
+        Parsed XML dicts in input order; a batch that failed after retries is returned
+        as its exception instead of raising, so one bad batch doesn't sink the rest
+    """
+    async def _run() -> List[Any]:
+        sem = asyncio.Semaphore(max_concurrency)
+        async with httpx.AsyncClient(timeout=120) as client:
+            async def _bounded(batch: List[str]) -> Dict:
+                async with sem:
+                    return await _pubmed_efetch_xml_async(client, batch)
+            return await asyncio.gather(*(_bounded(b) for b in pmid_batches), return_exceptions=True)
+    
+    return asyncio.run(_run())
+
+
+async def _pubmed_esearch_async(client: httpx.AsyncClient, params: Dict[str, str]) -> Dict:
+    """Async ESearch for one page (same retry and JSON cleanup policy as pubmed_esearch)"""
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            await _RATE_LIMITER.acquire_async()
+            response = await client.get(ESEARCH_URL, params=params)
+            response.raise_for_status()
+            try:
+                return _json_loads(response.content)
+            except Exception as e:
+                logger.error(f"JSON decode error: {e}")
+                return json.loads(CONTROL_CHARS_RE.sub('', response.text))
+        except Exception as e:
+            if attempt < max_retries - 1:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                    retry_after = e.response.headers.get("Retry-After", "")
+                    wait_time = float(retry_after) if retry_after.isdigit() else (attempt + 1) * 10
+                    logger.warning(f"PubMed rate limit hit (attempt {attempt + 1}/{max_retries}): {e}")
+                else:
+                    wait_time = (attempt + 1) * 5
+                    logger.warning(f"PubMed API error (attempt {attempt + 1}/{max_retries}): {e}")
+                logger.warning(f"Retrying in {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+            else:
+                logger.error(f"PubMed ESearch failed after {max_retries} attempts: {e}")
+                raise
+
+
+def pubmed_esearch_pages(term: str, offsets: List[int], mindate: Optional[str] = None,
+                         maxdate: Optional[str] = None, retmax: int = ESEARCH_PAGE_SIZE,
+                         max_concurrency: int = ESEARCH_CONCURRENCY) -> List[Any]:
     """
-    pmids = []
-    retstart = 0
-    failed_batches = []
+    Fetch several ESearch pages (one per retstart offset) concurrently
     
-    while True:
+    Returns:
+        ESearch result dicts in offset order; a page that failed after retries is
+        returned as its exception
+    """
+    return _esearch_many([_esearch_params(term, mindate, maxdate, retmax, o) for o in offsets], max_concurrency)
+
+
+def _count_cache_key(params: Dict[str, str]) -> str:
+    # Every query parameter is part of the key (only the credentials are left out), so a
+    # count is never reused for a different date window or query shape
+    key = {k: v for k, v in params.items() if k not in ("api_key", "email")}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _load_count_cache() -> Dict[str, List[float]]:
+    """Load the ESearch count cache ({key: [count, fetched_at]}); empty if missing or unreadable"""
+    try:
+        with open(ESEARCH_COUNT_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_count_cache(cache: Dict[str, List[float]]) -> None:
+    """Write the ESearch count cache atomically (a failed write only costs a cache miss)"""
+    try:
+        ESEARCH_COUNT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ESEARCH_COUNT_CACHE.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp, ESEARCH_COUNT_CACHE)
+    except OSError as e:
+        logger.warning(f"Could not write ESearch count cache {ESEARCH_COUNT_CACHE}: {e}")
+
+
+def pubmed_esearch_counts(terms: List[str], mindate: Optional[str] = None, maxdate: Optional[str] = None,
+                          max_concurrency: int = ESEARCH_CONCURRENCY) -> List[Any]:
+    """
+    Fetch the total result count for several queries concurrently (retmax=1 each)
+    
+    With ESEARCH_COUNT_CACHE_TTL_HOURS set, counts fetched within that window (for
+    the same query parameters) are served from the on-disk cache; only the rest hit
+    ESearch.
+    
+    Returns:
+        Counts in terms order; a query that failed after retries is returned as its exception
+    """
+    now = time.time()
+    cache = _load_count_cache() if ESEARCH_COUNT_CACHE_TTL > 0 else {}
+    param_sets = [_esearch_params(t, mindate, maxdate, 1, 0) for t in terms]
+    keys = [_count_cache_key(params) for params in param_sets]
+    counts: List[Any] = [None] * len(terms)
+    for i, key in enumerate(keys):
+        hit = cache.get(key)
+        if hit and now - hit[1] < ESEARCH_COUNT_CACHE_TTL:
+            counts[i] = int(hit[0])
+    
+    missing = [i for i, c in enumerate(counts) if c is None]
+    if missing:
+        pages = _esearch_many([param_sets[i] for i in missing], max_concurrency)
+        for i, page in zip(missing, pages):
+            if isinstance(page, BaseException):
+                counts[i] = page
+                continue
+            counts[i] = int(page.get("esearchresult", {}).get("count", "0"))
+            cache[keys[i]] = [counts[i], now]
+        if ESEARCH_COUNT_CACHE_TTL > 0:
+            _save_count_cache(cache)
+    
+    logger.info(f"ESearch counts: {len(terms) - len(missing)} cached, {len(missing)} fetched")
+    return counts
+
+
+def _esearch_history(result: Dict) -> Optional[Tuple[str, str]]:
+    """(WebEnv, query_key) from an ESearch response posted with usehistory=y, if present"""
+    esearchresult = result.get("esearchresult", {})
+    webenv, query_key = esearchresult.get("webenv"), esearchresult.get("querykey")
+    return (webenv, query_key) if webenv and query_key else None
+
+
+async def _pubmed_history_ids_async(client: httpx.AsyncClient, webenv: str, query_key: str,
+                                    retstart: int, retmax: int) -> List[str]:
+    """Async EFetch of one page of PMIDs (rettype=uilist) from a history-server result set"""
+    params = {
+        "db": "pubmed",
+        "WebEnv": webenv,
+        "query_key": query_key,
+        "retstart": str(retstart),
+        "retmax": str(retmax),
+        "rettype": "uilist",
+        "retmode": "text",
+        "email": NCBI_EMAIL
+    }
+    
+    if NCBI_API_KEY:
+        params["api_key"] = NCBI_API_KEY
+    
+    max_retries = 3
+    for attempt in range(max_retries):
         try:
-            batch = pubmed_esearch(query, mindate=mindate, retmax=200, retstart=retstart)
-            idlist = batch.get("esearchresult", {}).get("idlist", [])
-            
-            if not idlist:
-                break
-                
-            pmids.extend(idlist)
-            retstart += len(idlist)
-            
-            # Check if we've reached the end
-            total_count = int(batch.get("esearchresult", {}).get("count", "0"))
-            if retstart >= total_count:
-                break
-            
-            # Dynamic chunking: if we hit exactly 9,999 results, switch to chunking
-            if total_count == 9999 and retstart >= 9999:
-                logger.warning(f"DYNAMIC CHUNKING DETECTED - Hit 9,999 paper limit during simple search")
-                logger.warning(f"Returning {len(pmids):,} papers so far, caller will switch to chunking")
-                return pmids
-                
+            await _RATE_LIMITER.acquire_async()
+            response = await client.get(EFETCH_URL, params=params)
+            response.raise_for_status()
+            ids = response.text.split()
+            # An expired/invalid WebEnv comes back as an XML error body, not PMIDs
+            if not all(i.isdigit() for i in ids):
+                raise ValueError(f"Unexpected history EFetch response: {response.text[:200]}")
+            return ids
+        except Exception as e:
+            if attempt < max_retries - 1:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                    retry_after = e.response.headers.get("Retry-After", "")
+                    wait_time = float(retry_after) if retry_after.isdigit() else (attempt + 1) * 10
+                    logger.warning(f"PubMed rate limit hit (attempt {attempt + 1}/{max_retries}): {e}")
+                else:
+                    wait_time = (attempt + 1) * 5
+                    logger.warning(f"PubMed API error (attempt {attempt + 1}/{max_retries}): {e}")
+                logger.warning(f"Retrying in {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+            else:
+                logger.error(f"PubMed history EFetch failed after {max_retries} attempts: {e}")
+                raise
+
+
+def pubmed_history_id_pages(webenv: str, query_key: str, offsets: List[int],
+                            retmax: int = ESEARCH_PAGE_SIZE,
+                            max_concurrency: int = ESEARCH_CONCURRENCY) -> List[Any]:
+    """
+    Fetch several pages of PMIDs from a history-server result set concurrently
+    
+    Paging through WebEnv/query_key reads the stored result set instead of making
+    PubMed re-run the full query for every retstart offset.
+    
+    Returns:
+        PMID lists in offset order; a page that failed after retries is returned as its exception
+    """
+    if not offsets:
+        return []
+    
+    async def _run() -> List[Any]:
+        sem = asyncio.Semaphore(max_concurrency)
+        async with httpx.AsyncClient(timeout=60) as client:
+            async def _bounded(retstart: int) -> List[str]:
+                async with sem:
+                    return await _pubmed_history_ids_async(client, webenv, query_key, retstart, retmax)
+            return await asyncio.gather(*(_bounded(o) for o in offsets), return_exceptions=True)
+    
+    return asyncio.run(_run())
+
+
+def _esearch_many(param_sets: List[Dict[str, str]], max_concurrency: int) -> List[Any]:
+    """Run ESearch requests concurrently on one client (shared rate limiter); results in input order"""
+    if not param_sets:
+        return []
+    
+    async def _run() -> List[Any]:
+        sem = asyncio.Semaphore(max_concurrency)
+        async with httpx.AsyncClient(timeout=60) as client:
+            async def _bounded(params: Dict[str, str]) -> Dict:
+                async with sem:
+                    return await _pubmed_esearch_async(client, params)
+            return await asyncio.gather(*(_bounded(p) for p in param_sets), return_exceptions=True)
+    
+    return asyncio.run(_run())
+
+
+def esearch_all_pmids(query: str, mindate: Optional[str] = None, maxdate: Optional[str] = None,
+                      total_count: Optional[int] = None, limit: int = ESEARCH_MAX_RESULTS,
+                      label: str = "search", history: Optional[Tuple[str, str]] = None) -> Tuple[List[str], List[int]]:
+    """
+    Pull every result page for a query, up to limit (capped at PubMed's 9,999 window)
+    
+    The query is run once with usehistory=y; the remaining pages are then read
+    concurrently from the stored result set (WebEnv/query_key) rather than re-sending
+    the query per page. If history is already known (with its total_count), even the
+    first page comes from the history server. Falls back to per-page ESearch if
+    PubMed returns no history.
+    
+    Returns:
+        (PMIDs in page order, retstart offsets of pages that failed)
+    """
+    pmids: List[str] = []
+    failed_batches: List[int] = []
+    first_offset = 0
+    limit = min(limit, ESEARCH_MAX_RESULTS)
+    
+    if history is None or not total_count:
+        try:
+            first = pubmed_esearch(query, mindate=mindate, maxdate=maxdate, retmax=ESEARCH_PAGE_SIZE,
+                                   retstart=0, usehistory=True)
         except Exception as e:
-            # With retry logic in pubmed_esearch, this should be rare
-            # But if it happens after 3 retries, log and continue to next batch
-            logger.error(f"Error in simple search at retstart={retstart}: {e}")
+            logger.error(f"Error in {label} at retstart=0: {e}")
+            return pmids, [0]
+        idlist = first.get("esearchresult", {}).get("idlist", [])
+        if not idlist:
+            return pmids, failed_batches
+        pmids.extend(idlist)
+        total_count = int(first.get("esearchresult", {}).get("count", "0"))
+        first_offset = len(idlist)
+        history = _esearch_history(first)
+    
+    offsets = list(range(first_offset, min(total_count, limit), ESEARCH_PAGE_SIZE))
+    if history:
+        pages = pubmed_history_id_pages(history[0], history[1], offsets)
+    else:
+        pages = [
+            page if isinstance(page, BaseException) else page.get("esearchresult", {}).get("idlist", [])
+            for page in pubmed_esearch_pages(query, offsets, mindate=mindate, maxdate=maxdate)
+        ]
+    for retstart, page in zip(offsets, pages):
+        if isinstance(page, BaseException):
+            logger.error(f"Error in {label} at retstart={retstart}: {page}")
             failed_batches.append(retstart)
-            
-            # Try to continue with next batch
-            retstart += 200
-            
-            # Safety: if too many failures, give up
-            if len(failed_batches) >= 5:
-                logger.error(f"Too many failed batches ({len(failed_batches)}), stopping simple search")
-                break
-                
             continue
+        pmids.extend(page)
+    
+    # The history server pages past ESearch's window (a last page at retstart=9800 can
+    # return 200 ids), so trim to the limit; a full window still signals "chunk this"
+    del pmids[limit:]
+    return pmids, failed_batches
+
+
+def search_supplement_simple(query: str, mindate: Optional[str] = None,
+                             total_count: Optional[int] = None) -> List[str]:
+    """
+    Simple search for supplements with <10K results
+    
+    Args:
+        query: PubMed search query
+        mindate: Minimum publication date
+        total_count: Result count if already known
+        
+    Returns:
+        List of PMIDs
+    """
+    pmids, failed_batches = esearch_all_pmids(query, mindate=mindate, total_count=total_count,
+                                              label="simple search")
+    
+    # Dynamic chunking: if we hit exactly 9,999 results, the caller switches to chunking
+    if len(pmids) >= ESEARCH_MAX_RESULTS:
+        logger.warning(f"DYNAMIC CHUNKING DETECTED - Hit 9,999 paper limit during simple search")
+        logger.warning(f"Returning {len(pmids):,} papers so far, caller will switch to chunking")
+        return pmids
     
     # Report any paper loss
     if failed_batches:
@@ -333,7 +793,8 @@ def search_supplement_chunked(query: str, start_date: str, total_count: int,
         logger.warning(f"Maximum recursion depth reached ({recursion_depth}), stopping chunking")
         return []
     
-    all_pmids = []
+    # Insertion-ordered set: chunks dedupe as they arrive, no duplicate-laden list to scan at the end
+    all_pmids: Dict[str, None] = {}
     
     # Create date ranges from start_date to present
     start_dt = datetime.strptime(start_date, "%Y/%m/%d")
@@ -350,24 +811,30 @@ def search_supplement_chunked(query: str, start_date: str, total_count: int,
     if recursion_depth > 0:
         logger.info(f"RECURSIVE CHUNKING: Depth {recursion_depth} (max 3)")
     
+    # Date ranges are fixed up front, so every chunk's count check (posted to the
+    # history server) runs concurrently; chunks are then pulled in date order
+    ranges = []
     current_dt = start_dt
-    chunk_num = 1
-    
     while current_dt < end_dt:
-        # Calculate end of this chunk
         chunk_end_dt = min(current_dt + timedelta(days=years_per_chunk * 365.25), end_dt)
-        
-        # Format dates for PubMed
-        chunk_start = current_dt.strftime("%Y/%m/%d")
-        chunk_end = chunk_end_dt.strftime("%Y/%m/%d")
-        
+        ranges.append((current_dt.strftime("%Y/%m/%d"), chunk_end_dt.strftime("%Y/%m/%d")))
+        current_dt = chunk_end_dt + timedelta(days=1)
+    
+    count_checks = _esearch_many(
+        [_esearch_params(query, chunk_start, chunk_end, 1, 0, usehistory=True) for chunk_start, chunk_end in ranges],
+        ESEARCH_CONCURRENCY
+    )
+    
+    for chunk_num, ((chunk_start, chunk_end), count_check) in enumerate(zip(ranges, count_checks), 1):
         logger.info(f"CHUNK {chunk_num}: {chunk_start} to {chunk_end}")
         
         # OPTIMIZATION: Check count for this date range FIRST before pulling any papers
         # This lets us decide if we need to sub-chunk BEFORE pulling data
         try:
-            count_check = pubmed_esearch(query, mindate=chunk_start, maxdate=chunk_end, retmax=1, retstart=0)
+            if isinstance(count_check, BaseException):
+                raise count_check
             chunk_total = int(count_check.get("esearchresult", {}).get("count", "0"))
+            chunk_history = _esearch_history(count_check)
             
             # If this chunk itself exceeds 9,999, recursively chunk it BEFORE pulling papers
             if chunk_total >= 9999:
@@ -385,57 +852,20 @@ def search_supplement_chunked(query: str, start_date: str, total_count: int,
                 
                 # Skip to next chunk since we already got all papers via recursion
                 logger.info(f"CHUNK {chunk_num} COMPLETE: {len(chunk_pmids):,} papers retrieved (via sub-chunking)")
-                all_pmids.extend(chunk_pmids)
-                current_dt = chunk_end_dt + timedelta(days=1)
-                chunk_num += 1
+                all_pmids.update(dict.fromkeys(chunk_pmids))
                 continue
                 
         except Exception as e:
             logger.error(f"Error checking count for chunk {chunk_num}: {e}")
             logger.warning(f"Proceeding with normal pull despite count check failure")
             chunk_total = 0  # Will be set on first batch
+            chunk_history = None
         
         # Normal case: chunk has < 9,999 papers, pull them all
         logger.info(f"CHUNK {chunk_num}: Pulling {chunk_total:,} papers (no sub-chunking needed)")
-        chunk_pmids = []
-        retstart = 0
-        failed_batches = []
-        
-        while True:
-            try:
-                # Add date range to query
-                batch = pubmed_esearch(query, mindate=chunk_start, maxdate=chunk_end, 
-                                     retmax=200, retstart=retstart)
-                idlist = batch.get("esearchresult", {}).get("idlist", [])
-                
-                if not idlist:
-                    break
-                    
-                chunk_pmids.extend(idlist)
-                retstart += len(idlist)
-                
-                # Check if we've reached the end of this chunk
-                chunk_total = int(batch.get("esearchresult", {}).get("count", "0"))
-                if retstart >= chunk_total:
-                    break
-                    
-            except Exception as e:
-                # Log error but track which batch failed - don't break immediately
-                logger.error(f"Error in chunk {chunk_num} at retstart={retstart}: {e}")
-                logger.error(f"This batch of ~200 papers will be LOST unless we retry")
-                failed_batches.append(retstart)
-                
-                # Try to continue with next batch instead of giving up on entire chunk
-                # This prevents losing ALL remaining papers if one batch fails
-                retstart += 200
-                
-                # Safety: if we have too many consecutive failures, give up
-                if len(failed_batches) >= 5:
-                    logger.error(f"Too many failed batches ({len(failed_batches)}), stopping this chunk")
-                    break
-                    
-                # Otherwise continue to next batch
-                continue
+        chunk_pmids, failed_batches = esearch_all_pmids(query, mindate=chunk_start, maxdate=chunk_end,
+                                                        total_count=chunk_total, label=f"chunk {chunk_num}",
+                                                        history=chunk_history)
         
         # Report any paper loss
         if failed_batches:
@@ -443,30 +873,21 @@ def search_supplement_chunked(query: str, start_date: str, total_count: int,
             logger.warning(f"Failed retstart positions: {failed_batches}")
         
         logger.info(f"CHUNK {chunk_num} COMPLETE: {len(chunk_pmids):,} papers retrieved")
-        all_pmids.extend(chunk_pmids)
-        
-        # Move to next chunk
-        current_dt = chunk_end_dt + timedelta(days=1)
-        chunk_num += 1
+        all_pmids.update(dict.fromkeys(chunk_pmids))
         
         # Safety limit
-        if chunk_num > 20:  # Don't create too many chunks
+        if chunk_num >= 20:  # Don't create too many chunks
             logger.warning(f"Reached chunk limit, stopping")
             break
     
-    # Remove duplicates while preserving order
-    unique_pmids = []
-    seen = set()
-    for pmid in all_pmids:
-        if pmid not in seen:
-            unique_pmids.append(pmid)
-            seen.add(pmid)
+    unique_pmids = list(all_pmids)
     
     logger.info(f"DYNAMIC CHUNKING COMPLETE: {len(unique_pmids):,} unique PMIDs (deduplicated across chunks)")
     return unique_pmids
 
 
-def search_supplement_with_chunking(supplement: str, query: str, mindate: Optional[str] = None) -> List[str]:
+def search_supplement_with_chunking(supplement: str, query: str, mindate: Optional[str] = None,
+                                    total_count: Optional[int] = None) -> List[str]:
     """
     Search for a supplement using dynamic chunking to bypass PubMed's 10K limit
     
@@ -474,22 +895,24 @@ def search_supplement_with_chunking(supplement: str, query: str, mindate: Option
         supplement: Supplement name for logging
         query: PubMed search query
         mindate: Minimum publication date
+        total_count: Result count if already known (skips the count request)
         
     Returns:
         List of PMIDs for this supplement
     """
     # First, get total count to see if we need chunking
     try:
-        initial_batch = pubmed_esearch(query, mindate=mindate, retmax=1, retstart=0)
-        total_count = int(initial_batch.get("esearchresult", {}).get("count", "0"))
+        if total_count is None:
+            initial_batch = pubmed_esearch(query, mindate=mindate, retmax=1, retstart=0)
+            total_count = int(initial_batch.get("esearchresult", {}).get("count", "0"))
         
         if total_count < 9999:
             # Simple case - can get all results in one go
             logger.info(f"  {supplement}: {total_count:,} papers (single query - no chunking needed)")
-            pmids = search_supplement_simple(query, mindate)
+            pmids = search_supplement_simple(query, mindate, total_count=total_count)
             
             # Check if simple search hit the 9,999 limit and switched to chunking
-            if len(pmids) == 9999:
+            if len(pmids) >= ESEARCH_MAX_RESULTS:
                 logger.warning(f"  {supplement}: DYNAMIC CHUNKING TRIGGERED - Simple search hit 9,999 limit during execution")
                 logger.warning(f"  {supplement}: Switching to chunking to capture ALL papers beyond 10K limit")
                 return search_supplement_chunked(query, mindate or "1990/01/01", total_count)
@@ -521,12 +944,20 @@ def multi_supplement_search(mindate: Optional[str] = None) -> List[str]:
         List of unique PMIDs from all supplement searches
     """
     all_pmids = set()
-    search_results = {}
+    search_results = Counter()
     
     logger.info(f"Running comprehensive multi-supplement search for {len(SUPPLEMENT_QUERIES)} supplements...")
     logger.info(f"Using date-based chunking to bypass PubMed 10K limit")
     logger.info(f"Global limit: {MAX_TOTAL_PAPERS:,} papers")
     
+    # Every supplement needs its result count before deciding how to pull it, so fetch
+    # all counts concurrently up front; a failed count falls back to the per-supplement call
+    counts = pubmed_esearch_counts(list(SUPPLEMENT_QUERIES.values()), mindate=mindate)
+    known_counts = {
+        supplement: (None if isinstance(count, BaseException) else count)
+        for supplement, count in zip(SUPPLEMENT_QUERIES, counts)
+    }
+    
     for supplement, query in SUPPLEMENT_QUERIES.items():
         # Check global limit
         if len(all_pmids) >= MAX_TOTAL_PAPERS:
@@ -536,16 +967,15 @@ def multi_supplement_search(mindate: Optional[str] = None) -> List[str]:
         logger.info(f"Searching {supplement}:")
         
         # Use chunking-aware search
-        pmids = search_supplement_with_chunking(supplement, query, mindate)
+        pmids = search_supplement_with_chunking(supplement, query, mindate, total_count=known_counts[supplement])
         
-        # Add unique PMIDs (respecting global limit)
-        unique_pmids = []
-        for pmid in pmids:
-            if pmid not in all_pmids and len(all_pmids) < MAX_TOTAL_PAPERS:
-                unique_pmids.append(pmid)
-                all_pmids.add(pmid)
-            elif len(all_pmids) >= MAX_TOTAL_PAPERS:
-                break
+        # Add unique PMIDs (respecting global limit); set difference runs in C, and only
+        # the call that crosses the limit walks the results to keep the first ones found
+        unique_pmids = set(pmids).difference(all_pmids)
+        remaining = MAX_TOTAL_PAPERS - len(all_pmids)
+        if len(unique_pmids) > remaining:
+            unique_pmids = [pmid for pmid in dict.fromkeys(pmids) if pmid in unique_pmids][:remaining]
+        all_pmids.update(unique_pmids)
         
         search_results[supplement] = len(unique_pmids)
         logger.info(f"  {supplement}: {len(unique_pmids)} unique papers (total: {len(all_pmids):,})")
@@ -560,7 +990,7 @@ def multi_supplement_search(mindate: Optional[str] = None) -> List[str]:
     logger.info(f"  Supplements searched: {len(search_results)}/{len(SUPPLEMENT_QUERIES)}")
     logger.info(f"  Top supplements by paper count:")
     
-    for supplement, count in sorted(search_results.items(), key=lambda x: x[1], reverse=True)[:10]:
+    for supplement, count in search_results.most_common(10):
         logger.info(f"    {supplement}: {count} papers")
     
     return list(all_pmids)
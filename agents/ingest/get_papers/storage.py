@@ -9,16 +9,31 @@ import os
 import json
 import shutil
 import gzip
+import heapq
 import datetime
 import logging
+from bisect import bisect_right
+from collections import Counter
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, List, Any, Tuple, Optional
 
 from evidentfit_shared.utils import PROJECT_ROOT
+from get_papers.diversity import split_supplements
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # stdlib json fallback
 
 RUNS_BASE_DIR = PROJECT_ROOT / os.getenv("RUNS_BASE_DIR", "data/ingest/runs")
 COMPRESS_PAPERS = os.getenv("COMPRESS_PAPERS", "false").lower() == "true"
 KEEP_LAST_RUNS = int(os.getenv("KEEP_LAST_RUNS", "8"))
+# JSONL writers: serialized lines are written through a large buffer
+WRITE_BUFFER_SIZE = 1 << 20
+# get_storage_stats reliability bins: bisect_right(QUALITY_BIN_EDGES, score) indexes QUALITY_BIN_LABELS
+QUALITY_BIN_EDGES = (2.0, 3.0, 4.0)
+QUALITY_BIN_LABELS = ("<2.0", "2.0-2.9", "3.0-3.9", "4.0+")
 
 def _atomic_write_text(path: Path, content: str) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -27,6 +42,19 @@ def _atomic_write_text(path: Path, content: str) -> None:
         f.write(content)
     os.replace(tmp, path)
 
+if orjson is not None:
+    def _jsonl_line(doc: Dict) -> bytes:
+        return orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE)
+    _json_loads = orjson.loads
+else:
+    def _jsonl_line(doc: Dict) -> bytes:
+        return (json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+    _json_loads = json.loads
+
+def _write_jsonl_lines(f, docs: List[Dict]) -> None:
+    """Serialize docs as UTF-8 JSONL into binary file f (lines stream into f's buffer, no joined batch)."""
+    f.writelines(map(_jsonl_line, docs))
+
 def _now_run_id() -> str:
     return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -58,13 +86,11 @@ def save_selected_papers(selected_docs: List[Dict], run_dir: Path) -> Path:
     out_path.parent.mkdir(parents=True, exist_ok=True)
     tmp = out_path.with_suffix(out_path.suffix + ".tmp")
     if COMPRESS_PAPERS:
-        with gzip.open(tmp, "wt", encoding="utf-8") as f:
-            for d in selected_docs:
-                f.write(json.dumps(d, ensure_ascii=False) + "\n")
+        with gzip.open(tmp, "wb") as f:
+            _write_jsonl_lines(f, selected_docs)
     else:
-        with open(tmp, "w", encoding="utf-8") as f:
-            for d in selected_docs:
-                f.write(json.dumps(d, ensure_ascii=False) + "\n")
+        with open(tmp, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            _write_jsonl_lines(f, selected_docs)
     os.replace(tmp, out_path)
     return out_path
 
@@ -159,9 +185,8 @@ def save_selected_papers(docs: List[Dict], data_dir: str = DEFAULT_DATA_DIR,
     
     logger.info(f"Saving {len(docs)} papers to {file_path}")
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        for doc in docs:
-            f.write(json.dumps(doc) + '\n')
+    with open(file_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        _write_jsonl_lines(f, docs)
     
     logger.info(f"Successfully saved papers to {file_path}")
     return file_path
@@ -210,18 +235,22 @@ def load_selected_papers(data_dir: str = DEFAULT_DATA_DIR,
         logger.warning(f"Papers file not found: {file_path}")
         return []
     
-    papers = []
-    with open(file_path, 'r', encoding='utf-8') as f:
+    papers = list(_iter_papers(file_path))
+    
+    logger.info(f"Loaded {len(papers)} papers from {file_path}")
+    return papers
+
+
+def _iter_papers(file_path: Path):
+    """Yield paper dicts from a JSONL file one line at a time, logging and skipping bad lines"""
+    with open(file_path, 'rb') as f:
         for line_num, line in enumerate(f, 1):
             if line.strip():
                 try:
-                    papers.append(json.loads(line))
-                except json.JSONDecodeError as e:
+                    yield _json_loads(line)
+                except ValueError as e:
                     logger.error(f"Error parsing line {line_num} in {file_path}: {e}")
                     continue
-    
-    logger.info(f"Loaded {len(papers)} papers from {file_path}")
-    return papers
 
 
 def load_run_metadata(data_dir: str = DEFAULT_DATA_DIR,
@@ -272,12 +301,9 @@ def create_metadata_summary(selected_docs: List[Dict[str, Any]], run_info: Dict[
 
     for doc in selected_docs:
         # Supplements
-        supps = []
-        s = (doc.get("supplements") or "").strip()
-        if s:
-            supps = [x.strip() for x in s.split(",") if x.strip()]
-            for sp in supps:
-                bump(supp_counts, sp)
+        supps = split_supplements(doc.get("supplements") or "")
+        for sp in supps:
+            bump(supp_counts, sp)
 
         # Study type
         bump(study_type_counts, (doc.get("study_type") or "other"))
@@ -307,9 +333,9 @@ def create_metadata_summary(selected_docs: List[Dict[str, Any]], run_info: Dict[
         if primary_goal and population:
             bump(combo_goal_pop, f"{primary_goal}_{population}")
 
-    # Sort and truncate "top" combos
-    top_sg = dict(sorted(combo_supp_goal.items(), key=lambda x: x[1], reverse=True)[:10])
-    top_gp = dict(sorted(combo_goal_pop.items(), key=lambda x: x[1], reverse=True)[:5])
+    # Top combos (heap selection; same order as sorting and truncating)
+    top_sg = dict(heapq.nlargest(10, combo_supp_goal.items(), key=itemgetter(1)))
+    top_gp = dict(heapq.nlargest(5, combo_goal_pop.items(), key=itemgetter(1)))
 
     # Diagnostics
     general_share = (goal_counts.get("general", 0) / total * 100.0) if total else 0.0
@@ -319,10 +345,10 @@ def create_metadata_summary(selected_docs: List[Dict[str, Any]], run_info: Dict[
 
     summary = {
         "total_papers": total,
-        "supplement_distribution": dict(sorted(supp_counts.items(), key=lambda x: x[1], reverse=True)),
-        "study_type_distribution": dict(sorted(study_type_counts.items(), key=lambda x: x[1], reverse=True)),
-        "study_category_distribution": dict(sorted(study_category_counts.items(), key=lambda x: x[1], reverse=True)),
-        "goal_distribution": dict(sorted(goal_counts.items(), key=lambda x: x[1], reverse=True)),
+        "supplement_distribution": dict(sorted(supp_counts.items(), key=itemgetter(1), reverse=True)),
+        "study_type_distribution": dict(sorted(study_type_counts.items(), key=itemgetter(1), reverse=True)),
+        "study_category_distribution": dict(sorted(study_category_counts.items(), key=itemgetter(1), reverse=True)),
+        "goal_distribution": dict(sorted(goal_counts.items(), key=itemgetter(1), reverse=True)),
         "quality_distribution": quality_bins,
         "top_supplement_goal_combinations": top_sg,
         "top_goal_population_combinations": top_gp,
@@ -346,40 +372,35 @@ def get_storage_stats(data_dir: str = DEFAULT_DATA_DIR) -> Dict[str, Any]:
     Returns:
         Statistics dictionary
     """
-    papers = load_selected_papers(data_dir)
+    file_path = Path(data_dir) / DEFAULT_PAPERS_FILE
     metadata = load_run_metadata(data_dir)
     
-    if not papers:
+    if not file_path.exists():
+        logger.warning(f"Papers file not found: {file_path}")
         return {"total": 0, "supplements": {}, "quality_distribution": {}, "metadata": metadata}
     
-    supplement_counts = {}
-    quality_counts = {"4.0+": 0, "3.0-3.9": 0, "2.0-2.9": 0, "<2.0": 0}
+    # Single streaming pass: papers are tallied as they are read, never held as a list
+    total = 0
+    supplement_counts = Counter()
+    quality_bins = [0] * len(QUALITY_BIN_LABELS)
     
-    for paper in papers:
+    for paper in _iter_papers(file_path):
+        total += 1
         # Count supplements
         supplements = paper.get('supplements', [])
         if isinstance(supplements, str):
             supplements = supplements.split(',')
-        
-        for supp in supplements:
-            supp = supp.strip()
-            supplement_counts[supp] = supplement_counts.get(supp, 0) + 1
+        supplement_counts.update(supp.strip() for supp in supplements)
         
         # Count quality distribution
-        quality = paper.get('reliability_score', 0)
-        if quality >= 4.0:
-            quality_counts["4.0+"] += 1
-        elif quality >= 3.0:
-            quality_counts["3.0-3.9"] += 1
-        elif quality >= 2.0:
-            quality_counts["2.0-2.9"] += 1
-        else:
-            quality_counts["<2.0"] += 1
+        quality_bins[bisect_right(QUALITY_BIN_EDGES, paper.get('reliability_score', 0))] += 1
+    
+    if not total:
+        return {"total": 0, "supplements": {}, "quality_distribution": {}, "metadata": metadata}
     
     return {
-        "total": len(papers),
-        "supplements": supplement_counts,
-        "quality_distribution": quality_counts,
+        "total": total,
+        "supplements": dict(supplement_counts),
+        "quality_distribution": dict(zip(reversed(QUALITY_BIN_LABELS), reversed(quality_bins))),
         "metadata": metadata
     }
-
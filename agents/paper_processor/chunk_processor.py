@@ -11,6 +11,31 @@ from dataclasses import dataclass
 
 LOG = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are an expert research extractor. Return only valid JSON."
+
+# Which extracted fields each section contributes to the aggregate: (field, bucket, key)
+SECTION_FIELDS = {
+    'abstract': (
+        ('population_size', 'population', 'n'),
+    ),
+    'methods': (
+        ('population_size', 'population', 'n'),
+        ('dose_g_per_day', 'intervention', 'dose_g_per_day'),
+        ('duration_weeks', 'intervention', 'duration_weeks'),
+        ('intervention_details', 'intervention', 'details'),
+    ),
+    'results': (
+        ('effect_sizes', 'outcomes', 'effect_sizes'),
+        ('outcome_measures', 'outcomes', 'measures'),
+        ('statistical_significance', 'outcomes', 'significance'),
+    ),
+    'discussion': (
+        ('safety_notes', 'safety', 'notes'),
+        ('adverse_events', 'safety', 'adverse_events'),
+        ('contraindications', 'safety', 'contraindications'),
+    ),
+}
+
 @dataclass
 class ChunkResult:
     """Result from processing a single chunk."""
@@ -96,6 +121,15 @@ Return JSON with only the relevant fields found.
 """
             }
         }
+        # Bound template formatters per section, looked up once per chunk
+        self._prompt_fns = {
+            section: strategy['prompt_template'].format
+            for section, strategy in self.section_strategies.items()
+        }
+    
+    def _chunk_prompt(self, section: str, text: str) -> str:
+        """Section-targeted user prompt for one chunk (unknown sections use the abstract template)."""
+        return self._prompt_fns.get(section, self._prompt_fns['abstract'])(text=text)
     
     def process_chunk(self, chunk_id: str, section: str, start: int, text: str) -> ChunkResult:
         """Process a single chunk with section-targeted extraction."""
@@ -103,16 +137,13 @@ Return JSON with only the relevant fields found.
         
         start_time = time.time()
         
-        # Get strategy for this section
-        strategy = self.section_strategies.get(section, self.section_strategies['abstract'])
-        
-        # Create prompt
-        prompt = strategy['prompt_template'].format(text=text)
+        # Create prompt from the strategy for this section
+        prompt = self._chunk_prompt(section, text)
         
         # Process with LLM
         try:
             result = self.client.generate_json(
-                system_prompt="You are an expert research extractor. Return only valid JSON.",
+                system_prompt=SYSTEM_PROMPT,
                 user_prompt=prompt,
                 max_new_tokens=512,
                 temperature=0.0
@@ -131,30 +162,73 @@ Return JSON with only the relevant fields found.
             processing_time=processing_time
         )
     
-    def process_chunks_parallel(self, chunks: List[tuple]) -> List[ChunkResult]:
-        """Process multiple chunks in parallel."""
+    def _process_chunks_batched(self, chunks: List[tuple]) -> List[ChunkResult]:
+        """Process all chunks through the client's batched generation (one padded GPU batch per step)."""
         import time
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        start_time = time.time()
+        prompts = [self._chunk_prompt(section, text) for _, section, _, text in chunks]
+        outputs = self.client.generate_batch_json(
+            system_prompt=SYSTEM_PROMPT,
+            user_prompts=prompts,
+            max_new_tokens=512,
+            temperature=0.0
+        )
+        if len(outputs) != len(chunks):
+            raise ValueError(f"generate_batch_json returned {len(outputs)} results for {len(chunks)} prompts")
+        per_chunk_time = (time.time() - start_time) / len(chunks)
+        
+        return [
+            ChunkResult(
+                chunk_id=chunk_id,
+                section=section,
+                start=start,
+                result=result if isinstance(result, dict) else {},
+                processing_time=per_chunk_time
+            )
+            for (chunk_id, section, start, _), result in zip(chunks, outputs)
+        ]
+    
+    def process_chunks_parallel(self, chunks: List[tuple], max_workers: int = 8) -> List[ChunkResult]:
+        """
+        Process multiple chunks in parallel.
+        
+        Local models that expose generate_batch_json get every prompt in padded
+        batches (a few threads would only contend for the GPU); if that fails they
+        fall back to at most 2 workers, limited by GPU memory. Remote clients are
+        I/O-bound, so up to max_workers requests are kept in flight. Results come
+        back in input order.
+        """
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if not chunks:
+            return []
         
         start_time = time.time()
         results = []
         
-        # Process chunks in parallel (limited by GPU memory)
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            # Submit all chunks
-            future_to_chunk = {}
-            for chunk_id, section, start, text in chunks:
-                future = executor.submit(self.process_chunk, chunk_id, section, start, text)
-                future_to_chunk[future] = (chunk_id, section, start, text)
-            
-            # Collect results
-            for future in as_completed(future_to_chunk):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    chunk_id, section, start, text = future_to_chunk[future]
-                    LOG.error(f"Failed to process chunk {chunk_id}: {e}")
+        if hasattr(self.client, 'generate_batch_json'):
+            max_workers = min(max_workers, 2)  # Local GPU client: limited by GPU memory
+            try:
+                results = self._process_chunks_batched(chunks)
+            except Exception as e:
+                LOG.warning(f"Batched processing failed, falling back to per-chunk calls: {e}")
+        
+        if not results:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Submit all chunks
+                futures = [
+                    (executor.submit(self.process_chunk, chunk_id, section, start, text), chunk_id)
+                    for chunk_id, section, start, text in chunks
+                ]
+                
+                # Collect results in submission order
+                for future, chunk_id in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        LOG.error(f"Failed to process chunk {chunk_id}: {e}")
         
         total_time = time.time() - start_time
         LOG.info(f"Processed {len(chunks)} chunks in {total_time:.2f}s (avg: {total_time/len(chunks):.2f}s per chunk)")
@@ -178,41 +252,12 @@ Return JSON with only the relevant fields found.
             'discussion': 4    # Best for safety
         }
         
-        # Process results by priority
+        # Process results by priority (later sections overwrite earlier ones)
         for result in sorted(chunk_results, key=lambda x: section_priority.get(x.section, 5)):
-            section = result.section
             data = result.result
-            
-            # Population data (prefer methods, then abstract)
-            if section in ['methods', 'abstract']:
-                if 'population_size' in data and data['population_size']:
-                    aggregated['population']['n'] = data['population_size']
-            
-            # Intervention data (prefer methods)
-            if section == 'methods':
-                if 'dose_g_per_day' in data and data['dose_g_per_day']:
-                    aggregated['intervention']['dose_g_per_day'] = data['dose_g_per_day']
-                if 'duration_weeks' in data and data['duration_weeks']:
-                    aggregated['intervention']['duration_weeks'] = data['duration_weeks']
-                if 'intervention_details' in data and data['intervention_details']:
-                    aggregated['intervention']['details'] = data['intervention_details']
-            
-            # Outcomes data (prefer results)
-            if section == 'results':
-                if 'effect_sizes' in data and data['effect_sizes']:
-                    aggregated['outcomes']['effect_sizes'] = data['effect_sizes']
-                if 'outcome_measures' in data and data['outcome_measures']:
-                    aggregated['outcomes']['measures'] = data['outcome_measures']
-                if 'statistical_significance' in data and data['statistical_significance']:
-                    aggregated['outcomes']['significance'] = data['statistical_significance']
-            
-            # Safety data (prefer discussion)
-            if section == 'discussion':
-                if 'safety_notes' in data and data['safety_notes']:
-                    aggregated['safety']['notes'] = data['safety_notes']
-                if 'adverse_events' in data and data['adverse_events']:
-                    aggregated['safety']['adverse_events'] = data['adverse_events']
-                if 'contraindications' in data and data['contraindications']:
-                    aggregated['safety']['contraindications'] = data['contraindications']
+            for field, bucket, key in SECTION_FIELDS.get(result.section, ()):
+                value = data.get(field)
+                if value:
+                    aggregated[bucket][key] = value
         
         return aggregated
@@ -39,6 +39,11 @@ class MistralClient:
         self.tokenizer = AutoTokenizer.from_pretrained(
             self.model_name, use_fast=True, **_auth, **_local_kw
         )
+        # Mistral ships without a pad token, which padded batch tokenization needs; pad on
+        # the left so every prompt ends right where generation starts
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
 
         # Quantization defaults - 4-bit is default for RTX 3080
         env_q = os.environ.get("EVIDENTFIT_QUANT_4BIT")
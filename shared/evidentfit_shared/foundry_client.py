@@ -1,9 +1,13 @@
-import os, httpx
+import os, httpx, hashlib, sqlite3
+from array import array
+from pathlib import Path
 
 FOUNDATION_ENDPOINT = os.getenv("FOUNDATION_ENDPOINT", "").rstrip("/")
 FOUNDATION_KEY = os.getenv("FOUNDATION_KEY")
 API_VERSION = os.getenv("FOUNDATION_API_VERSION", "2024-05-01-preview")
 EMBED_MODEL = os.getenv("FOUNDATION_EMBED_MODEL", "text-embedding-3-small")
+# Optional content-hash -> vector sqlite cache for fill_vectors (off unless set)
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")
 
 def embed_texts(texts: list[str]) -> list[list[float]]:
     if not FOUNDATION_ENDPOINT or not FOUNDATION_KEY:
@@ -19,6 +23,51 @@ def embed_texts(texts: list[str]) -> list[list[float]]:
             return [d["embedding"] for d in data["data"]]
         return [c["embedding"] for c in data["choices"]]
 
+def _open_embed_cache():
+    """Open the sqlite embedding cache for one call (None when disabled)"""
+    if not EMBED_CACHE_PATH:
+        return None
+    Path(EMBED_CACHE_PATH).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(EMBED_CACHE_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vec BLOB)")
+    return conn
+
+def _content_hash(text: str) -> str:
+    # Model is part of the key so switching EMBED_MODEL never returns stale vectors
+    return hashlib.sha1(f"{EMBED_MODEL}\n{text}".encode("utf-8")).hexdigest()
+
+def fill_vectors(records: list[dict], batch_size: int = 64) -> list[dict]:
+    """Set record["content_vector"] in place, reusing cached vectors and embedding misses one batch per Foundry call"""
+    # A connection per call keeps this safe to use from any thread
+    cache = _open_embed_cache()
+    try:
+        misses: dict[str, list[dict]] = {}  # hash -> records sharing that content
+        for r in records:
+            h = _content_hash(r["content"])
+            if h in misses:
+                misses[h].append(r)
+                continue
+            row = cache.execute("SELECT vec FROM embeddings WHERE hash = ?", (h,)).fetchone() if cache else None
+            if row:
+                r["content_vector"] = array("d", row[0]).tolist()
+            else:
+                misses[h] = [r]
+        pending = list(misses.items())
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            vecs = embed_texts([rs[0]["content"] for _, rs in batch])
+            for (_, rs), v in zip(batch, vecs):
+                for r in rs:
+                    r["content_vector"] = v
+            if cache:
+                cache.executemany("INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+                                  [(h, array("d", v).tobytes()) for (h, _), v in zip(batch, vecs)])
+                cache.commit()
+    finally:
+        if cache:
+            cache.close()
+    return records
+
 def chat(messages: list[dict], model: str = None, max_tokens: int = 500, temperature: float = 0.2) -> str:
     """Chat completion using Azure AI Foundry Project endpoint"""
     if not FOUNDATION_ENDPOINT or not FOUNDATION_KEY:
@@ -1,9 +1,18 @@
-import os, httpx
+import os, json, time, httpx
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # stdlib json fallback
 
 API_VERSION = "2023-11-01"
 SEARCH_ENDPOINT = os.getenv("SEARCH_ENDPOINT", "").rstrip("/")
 SEARCH_INDEX = os.getenv("SEARCH_INDEX", "evidentfit-index")
 ADMIN_KEY = os.getenv("SEARCH_ADMIN_KEY")
+INDEX_BATCH_SIZE = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", "1000"))  # service max per docs/index request
+INDEX_CONCURRENCY = int(os.getenv("SEARCH_INDEX_CONCURRENCY", "4"))
+INDEX_MAX_RETRIES = 5
 
 # Validate required environment variables
 if not SEARCH_ENDPOINT:
@@ -13,6 +22,17 @@ if not ADMIN_KEY:
 
 def _client(headers): return httpx.Client(timeout=60, headers=headers)
 
+def _encode(payload: dict) -> bytes:
+    """Serialize a request body once (orjson when installed)."""
+    return orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode("utf-8")
+
+def _upload_actions(docs: list[dict]) -> list[dict]:
+    """mergeOrUpload actions, leaving out "_"-prefixed working fields (not index fields)."""
+    return [
+        {"@search.action":"mergeOrUpload", **{k: v for k, v in d.items() if not k.startswith("_")}}
+        for d in docs
+    ]
+
 def ensure_index(vector_dim: int = 1536):
     url = f"{SEARCH_ENDPOINT}/indexes/{SEARCH_INDEX}?api-version={API_VERSION}"
     headers = {"api-key": ADMIN_KEY, "Content-Type": "application/json"}
@@ -75,13 +95,64 @@ def ensure_index(vector_dim: int = 1536):
 def upsert_docs(docs: list[dict]):
     headers = {"api-key": ADMIN_KEY, "Content-Type": "application/json"}
     url = f"{SEARCH_ENDPOINT}/indexes/{SEARCH_INDEX}/docs/index?api-version={API_VERSION}"
-    payload = {"value": [{"@search.action":"mergeOrUpload", **d} for d in docs]}
+    payload = {"value": _upload_actions(docs)}
     with _client(headers) as c:
-        r = c.post(url, json=payload)
+        r = c.post(url, content=_encode(payload))
         if r.status_code != 200:
             print(f"Error response: {r.text}")
         r.raise_for_status()
 
+def _failed_keys(r: httpx.Response) -> list[str]:
+    """Keys of the documents a 207 (partial success) response reports as failed."""
+    return [item.get("key") for item in r.json().get("value", []) if not item.get("status")]
+
+def _post_index_batch(c: httpx.Client, url: str, actions: list[dict]):
+    """POST one docs/index batch, backing off on 429/503 (Retry-After when given).
+
+    A batch over the request payload cap (413) is split in half and retried, so large
+    batch sizes are safe even when documents carry long content. A 207 means some
+    documents failed; their keys are reported and the batch raises.
+    """
+    body = _encode({"value": actions})  # Serialized once, reused across retries
+    for attempt in range(INDEX_MAX_RETRIES):
+        r = c.post(url, content=body)
+        if r.status_code == 413 and len(actions) > 1:
+            break
+        if r.status_code in (429, 503) and attempt < INDEX_MAX_RETRIES - 1:
+            retry_after = r.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+            time.sleep(delay)
+            continue
+        if r.status_code not in (200, 207):
+            print(f"Error response: {r.text}")
+        r.raise_for_status()
+        if r.status_code == 207:
+            failed = _failed_keys(r)
+            if failed:
+                print(f"Error response: {len(failed)} of {len(actions)} documents failed: {failed[:20]}")
+                raise RuntimeError(f"Search indexing failed for {len(failed)} documents")
+        return
+    # Too large: retry as two halves
+    mid = len(actions) // 2
+    _post_index_batch(c, url, actions[:mid])
+    _post_index_batch(c, url, actions[mid:])
+
+def _post_index_batches(actions: list[dict], batch_size: int, max_concurrency: int):
+    """POST actions in batches from a thread pool (safe to call from inside a running event loop)"""
+    headers = {"api-key": ADMIN_KEY, "Content-Type": "application/json"}
+    url = f"{SEARCH_ENDPOINT}/indexes/{SEARCH_INDEX}/docs/index?api-version={API_VERSION}"
+    with _client(headers) as c, ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            executor.submit(_post_index_batch, c, url, actions[i:i+batch_size])
+            for i in range(0, len(actions), batch_size)
+        ]
+        for future in futures:
+            future.result()  # Re-raise the first batch failure
+
+def upsert_docs_batched(docs: list[dict], batch_size: int = INDEX_BATCH_SIZE, max_concurrency: int = INDEX_CONCURRENCY):
+    """Upsert many docs in batches, keeping up to max_concurrency requests in flight"""
+    _post_index_batches(_upload_actions(docs), batch_size, max_concurrency)
+
 def get_doc(doc_id: str) -> dict | None:
     headers = {"api-key": ADMIN_KEY}
     url = f"{SEARCH_ENDPOINT}/indexes/{SEARCH_INDEX}/docs/{doc_id}?api-version={API_VERSION}"
@@ -114,9 +185,6 @@ def search_docs(query: str, top: int = 50, skip: int = 0, select: list = None) -
 
 def clear_index():
     """Clear all documents from the index"""
-    headers = {"api-key": ADMIN_KEY, "Content-Type": "application/json"}
-    url = f"{SEARCH_ENDPOINT}/indexes/{SEARCH_INDEX}/docs/index?api-version={API_VERSION}"
-    
     # Get all document IDs first
     all_ids = []
     skip = 0
@@ -136,13 +204,8 @@ def clear_index():
         print("No documents to clear")
         return
     
-    # Delete in batches
-    batch_size = 50
-    for i in range(0, len(all_ids), batch_size):
-        batch_ids = all_ids[i:i+batch_size]
-        payload = {"value": [{"@search.action": "delete", "id": doc_id} for doc_id in batch_ids]}
-        with _client(headers) as c:
-            r = c.post(url, json=payload)
-            r.raise_for_status()
+    # Delete in concurrent batches
+    actions = [{"@search.action": "delete", "id": doc_id} for doc_id in all_ids]
+    _post_index_batches(actions, INDEX_BATCH_SIZE, INDEX_CONCURRENCY)
     
     print(f"Cleared {len(all_ids)} documents from index")
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "agents" / "paper_processor"))
+
+from chunk_processor import ChunkProcessor  # noqa: E402
+
+CHUNKS = [
+    (0, "methods", 0, "60 trained men took 5 g/day creatine for 8 weeks."),
+    (1, "results", 120, "1RM bench press rose 8 kg (p < 0.05)."),
+    (2, "discussion", 240, "No adverse events were reported."),
+]
+
+
+class BatchClient:
+    """Local-model stand-in: answers every prompt of one batched call, in order."""
+
+    def __init__(self, drop_last=False):
+        self.batch_calls = []
+        self.single_calls = 0
+        self.drop_last = drop_last
+
+    def generate_batch_json(self, system_prompt, user_prompts, max_new_tokens=512, temperature=0.0):
+        self.batch_calls.append(list(user_prompts))
+        outputs = [{"prompt_index": i} for i in range(len(user_prompts))]
+        return outputs[:-1] if self.drop_last else outputs
+
+    def generate_json(self, system_prompt, user_prompt, max_new_tokens=512, temperature=0.0):
+        self.single_calls += 1
+        return {"single": True}
+
+
+def test_batched_path_keeps_input_order():
+    client = BatchClient()
+    processor = ChunkProcessor(client)
+    results = processor.process_chunks_parallel(CHUNKS)
+
+    assert len(client.batch_calls) == 1 and client.single_calls == 0
+    assert client.batch_calls[0] == [processor._chunk_prompt(section, text) for _, section, _, text in CHUNKS]
+    assert [(r.chunk_id, r.section, r.start) for r in results] == [c[:3] for c in CHUNKS]
+    assert [r.result for r in results] == [{"prompt_index": i} for i in range(len(CHUNKS))]
+
+
+def test_short_batch_output_falls_back_per_chunk():
+    client = BatchClient(drop_last=True)
+    results = ChunkProcessor(client).process_chunks_parallel(CHUNKS)
+
+    assert client.single_calls == len(CHUNKS)
+    assert [r.chunk_id for r in results] == [c[0] for c in CHUNKS]
+    assert all(r.result == {"single": True} for r in results)
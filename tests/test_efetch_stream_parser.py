@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+import pytest
+import xmltodict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "agents" / "ingest"))
+
+from get_papers import pubmed_client  # noqa: E402
+from get_papers.pubmed_client import _EfetchStreamParser  # noqa: E402
+
+# Two records with attributes, repeated and single children, entities and mixed
+# content (inline <i>/<sup> inside titles and abstract text)
+EFETCH_XML = b"""<?xml version="1.0" ?>
+<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2024//EN" "https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_240101.dtd">
+<PubmedArticleSet>
+<PubmedArticle>
+  <MedlineCitation Status="MEDLINE" Owner="NLM">
+    <PMID Version="1">12345678</PMID>
+    <Article PubModel="Print">
+      <Journal><Title>Journal of the International Society of Sports Nutrition</Title></Journal>
+      <ArticleTitle>Effects of <i>creatine</i> monohydrate on strength &amp; power</ArticleTitle>
+      <Abstract>
+        <AbstractText Label="BACKGROUND" NlmCategory="BACKGROUND">Creatine (Cr) is widely used.</AbstractText>
+        <AbstractText Label="RESULTS" NlmCategory="RESULTS">1RM rose by 8 kg (<i>p</i> &lt; 0.05) versus placebo<sup>2</sup>.</AbstractText>
+      </Abstract>
+      <AuthorList CompleteYN="Y">
+        <Author ValidYN="Y"><LastName>Smith</LastName><Initials>J</Initials></Author>
+        <Author ValidYN="Y"><LastName>Lee</LastName><Initials>K</Initials></Author>
+      </AuthorList>
+    </Article>
+    <MeshHeadingList>
+      <MeshHeading><DescriptorName UI="D003401" MajorTopicYN="Y">Creatine</DescriptorName></MeshHeading>
+    </MeshHeadingList>
+  </MedlineCitation>
+  <PubmedData>
+    <ArticleIdList><ArticleId IdType="pubmed">12345678</ArticleId><ArticleId IdType="doi">10.1000/xyz</ArticleId></ArticleIdList>
+  </PubmedData>
+</PubmedArticle>
+<PubmedArticle>
+  <MedlineCitation Status="PubMed-not-MEDLINE" Owner="NLM">
+    <PMID Version="2">23456789</PMID>
+    <Article PubModel="Electronic">
+      <ArticleTitle>Caffeine and endurance</ArticleTitle>
+      <Abstract><AbstractText>Single unlabeled abstract.</AbstractText></Abstract>
+      <PublicationTypeList><PublicationType UI="D016449">Randomized Controlled Trial</PublicationType></PublicationTypeList>
+    </Article>
+  </MedlineCitation>
+</PubmedArticle>
+</PubmedArticleSet>
+"""
+
+
+def _stream_parse(data: bytes, chunk_size: int) -> dict:
+    parser = _EfetchStreamParser()
+    for i in range(0, len(data), chunk_size):
+        parser.feed(data[i:i + chunk_size])
+    return parser.close()
+
+
+def test_stream_parser_matches_xmltodict():
+    expected = xmltodict.parse(EFETCH_XML)
+    for chunk_size in (1, 37, len(EFETCH_XML)):
+        assert _stream_parse(EFETCH_XML, chunk_size) == expected
+
+
+ERROR_XML = b"""<?xml version="1.0" encoding="UTF-8" ?>
+<eFetchResult>
+  <ERROR>Cannot retrieve history data. query_key: 1, WebEnv: MCID_abc</ERROR>
+</eFetchResult>
+"""
+
+
+@pytest.mark.parametrize("lxml", [True, False])
+def test_stream_parser_rejects_non_article_set_root(monkeypatch, lxml):
+    if not lxml:
+        monkeypatch.setattr(pubmed_client, "etree", None)
+    with pytest.raises(ValueError, match="eFetchResult.*Cannot retrieve history data"):
+        _stream_parse(ERROR_XML, 16)
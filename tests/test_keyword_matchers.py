@@ -0,0 +1,47 @@
+import random
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "agents" / "ingest"))
+
+from get_papers.parsing import (  # noqa: E402
+    SUPP_KEYWORDS, HYPERTROPHY_OUTCOMES, WEIGHT_LOSS_OUTCOMES, STRENGTH_OUTCOMES,
+    ENDURANCE_OUTCOMES, PERFORMANCE_OUTCOMES, SAFETY_INDICATORS, OUTCOME_MAP,
+    _compile_keyword, _keyword_span,
+)
+
+KEYWORD_MAPS = (
+    SUPP_KEYWORDS, HYPERTROPHY_OUTCOMES, WEIGHT_LOSS_OUTCOMES, STRENGTH_OUTCOMES,
+    ENDURANCE_OUTCOMES, PERFORMANCE_OUTCOMES, SAFETY_INDICATORS, OUTCOME_MAP,
+)
+
+
+def _patterns():
+    return sorted({p for m in KEYWORD_MAPS for pats in m.values() for p in pats})
+
+
+def _texts(patterns, count=3000, seed=0):
+    # Lowercased texts (as the callers pass them) built from the patterns' own literal
+    # fragments and words, so most patterns have both real hits and near-misses
+    fragments = set()
+    for p in patterns:
+        fragments.update(f.strip().lower() for f in re.split(r"\\[a-zA-Z]|[()\[\]?*+|{}.^$\\]", p) if f.strip())
+    tokens = sorted(fragments | {w for f in fragments for w in f.split()})
+    seps = (" ", " ", " ", "-", "", ", ", "_", "(")
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(tokens) + rng.choice(seps) for _ in range(rng.randint(1, 8)))
+        for _ in range(count)
+    ]
+
+
+def test_keyword_span_matches_re_search():
+    patterns = _patterns()
+    texts = _texts(patterns)
+    for p in patterns:
+        matcher = _compile_keyword(p)
+        rx = re.compile(p, re.I)
+        for t in texts:
+            m = rx.search(t)
+            assert _keyword_span(t, matcher) == (m.span() if m else None), (p, t)